@@ -1,5 +1,10 @@
+from typing import TYPE_CHECKING
 from ortools.sat.python import cp_model
 
+if TYPE_CHECKING:
+    # lib/ is only needed on PYTHONPATH when solutions are recorded
+    from solution_sink import SolutionSink
+
 
 N = 9  # grid size
 I = range(N)  # row index
@@ -65,17 +70,35 @@ def somewhat_square_sudoku(model: cp_model.CpModel):
     return {"x": x, "y": gcd, "z": exc, "r": row}
 
 
+def solution_sink(variables, path: str, format="jsonl") -> "SolutionSink":
+    from solution_sink import SolutionSink
+
+    x = variables["x"]
+    fields = {
+        "x": [[x[i, j] for j in J] for i in I],
+        "r": variables["r"],
+        "y": variables["y"],
+        "z": variables["z"],
+    }
+    return SolutionSink(path, fields, format)
+
+
 class SolutionPrinter(cp_model.CpSolverSolutionCallback):
-    def __init__(self, variables):
+    def __init__(self, variables, sink: "SolutionSink | None" = None):
         cp_model.CpSolverSolutionCallback.__init__(self)
         self.r = variables["r"]
         self.x = variables["x"]
         self.y = variables["y"]
         self.z = variables["z"]
         self.n = 0
+        self.sink = sink
 
     def on_solution_callback(self) -> None:
         self.n += 1
+        if self.sink is not None:
+            self.sink.record(self)
+            return
+
         print("solution", self.n)
         print("row =", self.Value(self.r[4]))
         print("obj =", self.Value(self.y))
@@ -84,14 +107,27 @@ class SolutionPrinter(cp_model.CpSolverSolutionCallback):
 
 
 if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from contextlib import nullcontext
+
+    parser = ArgumentParser()
+    parser.add_argument("--sink", metavar="PATH", help="record solutions to a file")
+    parser.add_argument("--sink-format", choices=["jsonl", "binary"], default="jsonl")
+    args = parser.parse_args()
+
     model = cp_model.CpModel()
     variables = somewhat_square_sudoku(model)
 
     solver = cp_model.CpSolver()
     solver.parameters.enumerate_all_solutions = False
 
-    print_soln = SolutionPrinter(variables)
-    status = solver.Solve(model, solution_callback=print_soln)
+    with (
+        solution_sink(variables, args.sink, args.sink_format)
+        if args.sink
+        else nullcontext()
+    ) as sink:
+        print_soln = SolutionPrinter(variables, sink)
+        status = solver.Solve(model, solution_callback=print_soln)
     match status:
         case cp_model.OPTIMAL:
             print("OPTIMAL")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from resource import RUSAGE_SELF, getrusage
+from time import perf_counter
+from typing import Callable
+from ortools.sat.python import cp_model
+
+from grid import Encoding, Grid
+from puzzle import build_actual_puzzle, build_example_puzzle
+
+type Builder = Callable[[cp_model.CpModel, Encoding], Grid]
+
+
+@dataclass
+class Measurement:
+    label: str
+    build_time: float
+    proto_bytes: int
+    variables: int
+    constraints: int
+    peak_rss: int
+    solve_time: float | None = None
+    status: str | None = None
+
+    def __str__(self) -> str:
+        solve = (
+            "-" if self.solve_time is None else f"{self.solve_time:8.2f}s {self.status}"
+        )
+        return (
+            f"{self.label:<24}"
+            f" build {self.build_time:8.2f}s"
+            f" proto {self.proto_bytes / 1e6:8.2f}MB"
+            f" vars {self.variables:>9}"
+            f" cons {self.constraints:>9}"
+            f" rss {self.peak_rss / 2**20:7.0f}MB"
+            f" solve {solve}"
+        )
+
+
+def measure(
+    label: str,
+    build: Builder,
+    encoding: Encoding,
+    time_limit: float | None = None,
+) -> Measurement:
+    """Builds (and optionally solves) a puzzle model, recording its size and timings
+
+    Peak RSS is that of the whole process, so isolate calls with `measure_in_subprocess`.
+    """
+    model = cp_model.CpModel()
+
+    start = perf_counter()
+    build(model, encoding)
+    build_time = perf_counter() - start
+
+    proto = model.Proto()
+    result = Measurement(
+        label=label,
+        build_time=build_time,
+        proto_bytes=proto.ByteSize(),
+        variables=len(proto.variables),
+        constraints=len(proto.constraints),
+        peak_rss=getrusage(RUSAGE_SELF).ru_maxrss * 1024,
+    )
+
+    if time_limit is not None:
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        status = solver.Solve(model)
+        result.solve_time = solver.WallTime()
+        result.status = solver.StatusName(status)
+
+    return result
+
+
+def measure_in_subprocess(*args) -> Measurement:
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(measure, *args).result()
+
+
+def compare(
+    name: str,
+    builds: list[tuple[str, Builder]],
+    encodings: dict[str, Encoding],
+    time_limit: float | None,
+):
+    for puzzle, build in builds:
+        print(f"{name}: {puzzle}")
+        for label, encoding in encodings.items():
+            result = measure_in_subprocess(label, build, encoding, time_limit)
+            print(result, flush=True)
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser("Number Cross 5 encoding benchmarks")
+    parser.add_argument(
+        "benchmark",
+        choices=Encoding.choices(),
+        help="encoding option to compare, all other options are held fixed",
+    )
+    parser.add_argument("-m", "--main", action="store_true")
+    parser.add_argument("-t", "--test", action="store_true")
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="also solve each model with this time limit in seconds",
+    )
+    for option, choices in Encoding.choices().items():
+        parser.add_argument(
+            f"--{option}", choices=choices, default=getattr(Encoding(), option)
+        )
+    args = parser.parse_args()
+
+    base = Encoding(**{option: getattr(args, option) for option in Encoding.choices()})
+
+    builds = []
+    if args.test or not args.main:
+        builds.append(("example", build_example_puzzle))
+    if args.main:
+        builds.append(("actual", build_actual_puzzle))
+
+    encodings = {
+        f"{args.benchmark}={choice}": replace(base, **{args.benchmark: choice})
+        for choice in Encoding.choices()[args.benchmark]
+    }
+
+    compare(args.benchmark, builds, encodings, args.time_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Iterator
+from ortools.sat.python import cp_model
+
+
+@dataclass
+class Record:
+    """Resources used by one call to a model building helper (inclusive of nested helpers)"""
+
+    helper: str
+    row: int | None
+    depth: int
+    wall_time: float = 0.0
+    variables: int = 0
+    constraints: int = 0
+    proto_bytes: int = 0
+    peak_memory: int = 0
+
+
+@dataclass
+class _Frame:
+    record: Record
+    start: float
+    variables: int
+    constraints: int
+    memory: int
+    peak: int = 0  # highest absolute traced memory seen by nested frames
+
+
+@dataclass
+class BuildProfiler:
+    """Collects a Record for every profiled helper called while the profiler is active"""
+
+    model: cp_model.CpModel
+    records: list[Record] = field(default_factory=list)
+    _stack: list[_Frame] = field(default_factory=list)
+
+    @contextmanager
+    def measure(self, helper: str, row: int | None = None) -> Iterator[Record]:
+        if row is None and self._stack:
+            row = self._stack[-1].record.row
+
+        proto = self.model.Proto()
+        record = Record(helper=helper, row=row, depth=len(self._stack))
+        self.records.append(record)
+
+        tracemalloc.reset_peak()
+        frame = _Frame(
+            record=record,
+            start=perf_counter(),
+            variables=len(proto.variables),
+            constraints=len(proto.constraints),
+            memory=tracemalloc.get_traced_memory()[0],
+        )
+        self._stack.append(frame)
+        try:
+            yield record
+        finally:
+            self._stack.pop()
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+
+            record.wall_time = perf_counter() - frame.start
+            record.variables = len(proto.variables) - frame.variables
+            record.constraints = len(proto.constraints) - frame.constraints
+            record.proto_bytes = sum(
+                x.ByteSize() for x in proto.variables[frame.variables :]
+            ) + sum(x.ByteSize() for x in proto.constraints[frame.constraints :])
+            record.peak_memory = peak - frame.memory
+
+    def report(self) -> dict:
+        """Summarizes records per helper and per row
+
+        Nested helpers are included in the totals of the helpers that call them, so only
+        top-level records are summed into the overall total.
+        """
+
+        def summarize(records: list[Record]) -> dict:
+            return {
+                "calls": len(records),
+                "wall_time": sum(r.wall_time for r in records),
+                "variables": sum(r.variables for r in records),
+                "constraints": sum(r.constraints for r in records),
+                "proto_bytes": sum(r.proto_bytes for r in records),
+                "peak_memory": max((r.peak_memory for r in records), default=0),
+            }
+
+        helpers = defaultdict(list)
+        rows = defaultdict(lambda: defaultdict(list))
+        for record in self.records:
+            helpers[record.helper].append(record)
+            if record.row is not None:
+                rows[record.row][record.helper].append(record)
+
+        proto = self.model.Proto()
+        return {
+            "model": {
+                "variables": len(proto.variables),
+                "constraints": len(proto.constraints),
+                "proto_bytes": proto.ByteSize(),
+            },
+            "total": summarize([r for r in self.records if r.depth == 0]),
+            "helpers": {name: summarize(rs) for name, rs in helpers.items()},
+            "rows": {
+                row: {name: summarize(rs) for name, rs in helpers_.items()}
+                for row, helpers_ in sorted(rows.items())
+            },
+            "records": [asdict(r) for r in self.records if r.depth == 0],
+        }
+
+
+_profiler: BuildProfiler | None = None
+
+
+@contextmanager
+def profiling(model: cp_model.CpModel) -> Iterator[BuildProfiler]:
+    """Profiles all helpers decorated with `profiled` or `profiled_clue` within the context"""
+    global _profiler
+    assert _profiler is None, "build profiles cannot be nested"
+
+    profiler = BuildProfiler(model)
+    _profiler = profiler
+    tracemalloc.start()
+    try:
+        yield profiler
+    finally:
+        tracemalloc.stop()
+        _profiler = None
+
+
+def profiled[**P, T](
+    row: Callable[..., int | None] = lambda *args, **kwargs: None,
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Records each call of the decorated helper, attributing it to row(*args, **kwargs)"""
+
+    def decorator(fn: Callable[P, T]) -> Callable[P, T]:
+        @wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if _profiler is None:
+                return fn(*args, **kwargs)
+            with _profiler.measure(fn.__name__, row(*args, **kwargs)):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profiled_clue[**P, F: Callable](factory: Callable[P, F]) -> Callable[P, F]:
+    """Records each call of the constraint generator returned by a clue factory
+
+    The generator is drained within the measurement so that the constraints it posts are counted.
+    """
+
+    @wraps(factory)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> F:
+        get_constraints = factory(*args, **kwargs)
+
+        @wraps(get_constraints)
+        def profiled_get_constraints(*args, **kwargs):
+            if _profiler is None:
+                return get_constraints(*args, **kwargs)
+            with _profiler.measure(factory.__name__):
+                return list(get_constraints(*args, **kwargs))
+
+        return profiled_get_constraints  # type: ignore
+
+    return wrapper
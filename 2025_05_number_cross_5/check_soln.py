@@ -1,6 +1,17 @@
+import json
 from collections import Counter
-from math import prod
+from functools import lru_cache
+from itertools import batched
+from pathlib import Path
 from string import digits
+from typing import Callable, Iterable, Iterator
+import numpy as np
+from utils import digit_products
+from utils.lib import digit_dp
+from utils.prime_index import PrimeIndex
+
+# Generated with: python -m utils.prime_index ../resources/primes.idx
+PRIME_INDEX = Path(__file__).parent.parent / "resources" / "primes.idx"
 
 
 def parse_nums(line: str) -> list[int]:
@@ -22,7 +33,14 @@ def square(x: int):
 
 
 def product_of_digits_is(target: int):
-    return lambda x: prod(as_digits(x)) == target
+    exponents = digit_products.exponents(target)
+
+    def accept(x: int) -> bool:
+        # None marks a target or digit product that is not 7-smooth (or zero): never equal
+        found = digit_products.digit_exponents(as_digits(x))
+        return exponents is not None and found is not None and found == exponents
+
+    return accept
 
 
 def multiple_of(target: int):
@@ -30,7 +48,7 @@ def multiple_of(target: int):
 
 
 def divisible_by_each_of_its_digits(x: int):
-    return all(multiple_of(d)(x) for d in as_digits(x))
+    return digit_dp.is_self_dividing(x)
 
 
 def odd_and_a_palindrome(x: int):
@@ -39,47 +57,233 @@ def odd_and_a_palindrome(x: int):
     return ds[0] % 2 == 1 and all(ds[i] == ds[n - 1 - i] for i in range(n // 2))
 
 
+def fibonacci_below(n: int) -> list[int]:
+    fibs = [1, 2]
+    while fibs[-1] + fibs[-2] < n:
+        fibs.append(fibs[-1] + fibs[-2])
+    return fibs
+
+
+FIBONACCI = fibonacci_below(2**63)
+FIBONACCI_SET = set(FIBONACCI)
+
+
 def fibonacci(x: int):
-    a, b = 0, 1
-    while b < x:
-        a, b = b, a + b
-    return b == x
+    return x in FIBONACCI_SET
+
+
+@lru_cache
+def prime_index() -> PrimeIndex:
+    return PrimeIndex.load(PRIME_INDEX)
 
 
 def prime(x: int):
-    s = str(x)
-    n = len(s)
-    with open("../resources/primes.txt") as f:
-        for line in f:
-            p = line.strip()
-            if p == s:
-                return True
-            elif len(p) > n:
-                break
-    return False
+    return x in prime_index()
 
 
-if __name__ == "__main__":
-    checks = [
-        square,
-        product_of_digits_is(20),
-        multiple_of(13),
-        multiple_of(32),
-        divisible_by_each_of_its_digits,
-        product_of_digits_is(25),
-        divisible_by_each_of_its_digits,
-        odd_and_a_palindrome,
-        fibonacci,
-        product_of_digits_is(2025),
-        prime,
+CHECKS = [
+    square,
+    product_of_digits_is(20),
+    multiple_of(13),
+    multiple_of(32),
+    divisible_by_each_of_its_digits,
+    product_of_digits_is(25),
+    divisible_by_each_of_its_digits,
+    odd_and_a_palindrome,
+    fibonacci,
+    product_of_digits_is(2025),
+    prime,
+]
+
+
+# Vectorized predicates over int64 arrays of numbers (none of which contain a zero digit)
+type Check = Callable[[np.ndarray], np.ndarray]
+
+POWERS_OF_10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def digits_of(xs: np.ndarray) -> Iterator[np.ndarray]:
+    """Yields the digits of every number from least significant, 0 once a number runs out"""
+    rest = xs.copy()
+    while rest.any():
+        yield rest % 10
+        rest //= 10
+
+
+def square_v(xs: np.ndarray) -> np.ndarray:
+    root = np.sqrt(xs).astype(np.int64)
+    root += (root + 1) * (root + 1) <= xs  # correct float rounding
+    root -= root * root > xs
+    return root * root == xs
+
+
+def product_of_digits_is_v(target: int) -> Check:
+    def check(xs: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(xs), dtype=bool)
+        lengths = np.searchsorted(POWERS_OF_10, xs, side="right")
+        for length in np.unique(lengths).tolist():
+            mask = lengths == length
+            result[mask] = np.isin(xs[mask], digit_products.numbers(length, target))
+        return result
+
+    return check
+
+
+def multiple_of_v(target: int) -> Check:
+    return lambda xs: xs % target == 0
+
+
+def divisible_by_each_of_its_digits_v(xs: np.ndarray) -> np.ndarray:
+    return digit_dp.is_self_dividing_v(xs)
+
+
+def odd_and_a_palindrome_v(xs: np.ndarray) -> np.ndarray:
+    reverse = np.zeros_like(xs)
+    for d in digits_of(xs):
+        reverse = np.where(d > 0, reverse * 10 + d, reverse)
+    return (xs % 2 == 1) & (xs == reverse)
+
+
+def fibonacci_v(xs: np.ndarray) -> np.ndarray:
+    return np.isin(xs, FIBONACCI)
+
+
+def prime_v(xs: np.ndarray) -> np.ndarray:
+    return prime_index().members(xs)
+
+
+VECTOR_CHECKS: list[Check] = [
+    square_v,
+    product_of_digits_is_v(20),
+    multiple_of_v(13),
+    multiple_of_v(32),
+    divisible_by_each_of_its_digits_v,
+    product_of_digits_is_v(25),
+    divisible_by_each_of_its_digits_v,
+    odd_and_a_palindrome_v,
+    fibonacci_v,
+    product_of_digits_is_v(2025),
+    prime_v,
+]
+
+
+def numbers_of(grids: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the grid index, row and value of every maximal run of non-zero digits
+
+    `grids` has shape (grid, row, column); runs are found by one pass over the columns.
+    """
+    ngrid, nrow, ncol = grids.shape
+    value = np.zeros((ngrid, nrow), dtype=np.int64)
+    runs = np.zeros_like(grids)
+    for j in range(ncol):
+        d = grids[:, :, j]
+        value = np.where(d > 0, value * 10 + d, 0)
+        runs[:, :, j] = value
+
+    last = np.zeros_like(grids, dtype=bool)
+    last[:, :, -1] = True
+    last[:, :, :-1] = grids[:, :, 1:] == 0
+    grid, row, _ = np.nonzero((grids > 0) & last)
+    return grid, row, runs[(grids > 0) & last]
+
+
+def validate(
+    grids: np.ndarray, checks: list[Check] = VECTOR_CHECKS
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns whether each grid passes every row clue and uniqueness, and its answer sum"""
+    grid, row, value = numbers_of(grids)
+    passes = np.ones(len(grids), dtype=bool)
+
+    for i, check in enumerate(checks):
+        mask = row == i
+        # Enumerated solutions share most of their numbers, so each distinct one is checked once
+        distinct, inverse = np.unique(value[mask], return_inverse=True)
+        passes[grid[mask][~check(distinct)[inverse]]] = False
+
+    order = np.lexsort((value, grid))
+    grid_, value_ = grid[order], value[order]
+    repeated = (grid_[1:] == grid_[:-1]) & (value_[1:] == value_[:-1])
+    passes[grid_[1:][repeated]] = False
+
+    total = np.zeros(len(grids), dtype=np.int64)
+    np.add.at(total, grid, value)
+    return passes, total
+
+
+def read_grids(lines: Iterable[str], chunk: int) -> Iterator[tuple[list, np.ndarray]]:
+    """Streams JSONL solution records (see solution_sink) as (solns, int64 grids) chunks"""
+    for batch in batched(filter(str.strip, lines), chunk):
+        records = [json.loads(line) for line in batch]
+        yield (
+            [r.get("soln", i) for i, r in enumerate(records)],
+            np.array([r["value"] for r in records], dtype=np.int64),
+        )
+
+
+def validate_batch(lines: Iterable[str], chunk: int = 4096) -> tuple[int, int]:
+    """Prints the solution number, PASS/FAIL and answer sum of every grid"""
+    count = passed = 0
+    for solns, grids in read_grids(lines, chunk):
+        passes, totals = validate(grids)
+        for soln, ok, total in zip(solns, passes.tolist(), totals.tolist()):
+            print(soln, "PASS" if ok else "FAIL", total)
+        count += len(solns)
+        passed += int(passes.sum())
+    return count, passed
+
+
+def test_validate():
+    soln = [parse_nums(line) for line in open(Path(__file__).parent / "solns/full.txt")]
+    grid = [
+        [int(x) for x in line.split()]
+        for line in open(Path(__file__).parent / "solns/full.txt")
     ]
+    broken = [row[:] for row in grid]
+    broken[0][6] = 6  # 342226 is not a square
+
+    passes, totals = validate(np.array([grid, broken], dtype=np.int64))
+    assert passes.tolist() == [True, False]
+    assert totals[0] == sum(x for nums in soln for x in nums)
+
+    lines = [json.dumps({"soln": k, "value": g}) for k, g in [(1, grid), (2, broken)]]
+    assert validate_batch(lines, chunk=1) == (2, 1)
+
+
+def test_vector_checks():
+    xs = np.arange(1, 20_000, dtype=np.int64)
+    xs = xs[[0 not in as_digits(x) for x in xs.tolist()]]
+    for scalar, vector in zip(CHECKS, VECTOR_CHECKS):
+        assert vector(xs).tolist() == list(map(scalar, xs.tolist()))
+
+    # Neither 11 nor a number containing 0 has a 7-smooth digit product
+    assert not product_of_digits_is(11)(105)
+    assert not product_of_digits_is(20)(405)
+    assert product_of_digits_is(20)(45)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--batch",
+        metavar="PATH",
+        help="validate a JSONL file of solver solutions ('-' for stdin) instead of one grid",
+    )
+    parser.add_argument("--chunk", type=int, default=4096)
+    args = parser.parse_args()
 
-    lines = list(map(parse_nums, open(0).read().split("\n")))
+    if args.batch:
+        with open(0 if args.batch == "-" else args.batch) as f:
+            count, passed = validate_batch(f, args.chunk)
+        print(f"{passed}/{count} grids passed")
+    else:
+        lines = list(map(parse_nums, open(0).read().split("\n")))
 
-    for check, nums in zip(checks, lines):
-        assert all(map(check, nums))
+        for check, nums in zip(CHECKS, lines):
+            assert all(map(check, nums))
 
-    nums = [x for nums in lines for x in nums]
-    assert all(n == 1 for n in Counter(nums).values())
+        nums = [x for nums in lines for x in nums]
+        assert all(n == 1 for n in Counter(nums).values())
 
-    print(sum(nums))
+        print(sum(nums))
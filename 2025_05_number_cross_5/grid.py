@@ -1,9 +1,56 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from itertools import pairwise, product
-from typing import Self
+from typing import TYPE_CHECKING, Callable, Literal, Self, get_args
 from ortools.sat.python import cp_model
 
-from utils.tiling import Tiling, get_tilings
+from build_profile import profiled
+from utils.tiling import Tiling, compatibility, tilings
+
+if TYPE_CHECKING:
+    # lib/ is only needed on PYTHONPATH when solutions are recorded
+    from solution_sink import Format, SolutionSink
+
+
+@dataclass(frozen=True)
+class Encoding:
+    """Selects between alternative CP-SAT encodings of the same puzzle logic"""
+
+    # "reified": one half-reified equality per (row, cell, tiling)
+    # "table": one allowed-assignments table over each row's tiled cells and pattern literals
+    patterns: Literal["reified", "table"] = "reified"
+
+    # "pairwise": reified != between every pair of groups of every pair of tilings
+    # "spans": one number per distinct (row, start, length) span, all-different per length
+    uniqueness: Literal["pairwise", "spans"] = "pairwise"
+
+    # "bools": one BoolVar per candidate number with half-reified digit equalities
+    # "table": one allowed-assignments table over the digit variables
+    candidates: Literal["bools", "table"] = "table"
+
+    # "linear": x == divisor * quotient + remainder with a quotient of up to 10^n
+    # "automaton": a left-to-right residue DFA over the digit variables
+    remainders: Literal["linear", "automaton"] = "automaton"
+
+    # "candidates": series members of each length posted with the candidates encoding
+    # "automaton": a minimized digit-trie DFA of the series members of each length
+    series: Literal["candidates", "automaton"] = "automaton"
+
+    # "cells": at-most-one over every vertically adjacent pair of cells
+    # "automaton": one DFA over the row pattern indices that only steps between compatible tilings
+    rows: Literal["cells", "automaton"] = "cells"
+
+    # "tilings": clue constraints per group of every row tiling, enforced by its pattern literal
+    # "spans": clue constraints once per distinct span, enforced by its span-active literal
+    clues: Literal["tilings", "spans"] = "spans"
+
+    # "full": every tiling of every row and digits 0-9 in every cell
+    # "clues": only the tilings and digits each row's clue and highlights allow (pre-filtered)
+    domains: Literal["full", "clues"] = "clues"
+
+    @classmethod
+    def choices(cls) -> dict[str, tuple[str, ...]]:
+        """Returns the alternatives available for each encoding option"""
+        return {f.name: get_args(f.type) for f in fields(cls)}
 
 
 @dataclass
@@ -19,19 +66,96 @@ class Grid:
     # Internals
     _tilings: list[Tiling]
     _pattern: list[list[cp_model.IntVar]]
+    _encoding: Encoding = field(default_factory=Encoding)
+    _active: dict[tuple[int, int, int], cp_model.IntVar] = field(default_factory=dict)
+    _allowed: list[list[int]] = field(default_factory=list)
+
+    def allowed(self, i: int) -> list[int]:
+        """Returns the indices of the tilings row i may take (all unless pre-filtered)"""
+        return self._allowed[i] if self._allowed else list(range(len(self._tilings)))
+
+    def row_spans(self, i: int) -> list[tuple[int, int]]:
+        """Returns the distinct (start, length) spans of untiled groups in row i's tilings"""
+        return sorted(
+            set(
+                (group.cells[0], len(group.cells))
+                for t in self.allowed(i)
+                for group in self._tilings[t].groups
+            )
+        )
 
     @property
     def display_callback(self) -> cp_model.CpSolverSolutionCallback:
         return DisplayCallback(self)
 
+    def solution_sink(self, path: str, format: "Format" = "jsonl") -> "SolutionSink":
+        """Returns a sink recording the labels, tiling and values of each solution"""
+        from utils.lib import solution_sink
+
+        return solution_sink.SolutionSink(
+            path,
+            {"label": self.label, "tiled": self.tiled, "value": self.value},
+            format,
+        )
+
+    def show(self, value: Callable[[cp_model.IntVar], int]) -> None:
+        """Prints the labels, tiling and values of a solution"""
+        for name, cells in [
+            ("labels", self.label),
+            ("tiled", self.tiled),
+            ("value", self.value),
+        ]:
+            print(name)
+            print(
+                "\n".join(" ".join(str(value(cell)) for cell in row) for row in cells)
+            )
+
+    @property
+    def spans(self) -> list[tuple[int, int]]:
+        """Returns the distinct (start, length) spans of untiled groups across all row tilings"""
+        return sorted(
+            set(
+                (group.cells[0], len(group.cells))
+                for tiling in self._tilings
+                for group in tiling.groups
+            )
+        )
+
+    def span_active(self, i: int, start: int, length: int) -> cp_model.IntVar:
+        """Returns a literal that holds iff cells [start, start + length) of row i form a number"""
+        key = (i, start, length)
+        if key not in self._active:
+            active = self.model.NewBoolVar(f"s[{i},{start}:{start + length}]")
+            self.model.Add(
+                active
+                == sum(
+                    self._pattern[i][t]
+                    for t in self.allowed(i)
+                    if any(
+                        group.cells[0] == start and len(group.cells) == length
+                        for group in self._tilings[t].groups
+                    )
+                )
+            )
+            self._active[key] = active
+        return self._active[key]
+
     @classmethod
+    @profiled()
     def from_regions(
         cls,
         model: cp_model.CpModel,
         grid: list[list[int]],
         highlights: list[list[bool]],
+        encoding: Encoding = Encoding(),
+        allowed: list[list[int]] | None = None,
+        digits: list[list[list[int]]] | None = None,
     ) -> Self:
-        """Initialize decision variables for a grid and add constraints for basic logic"""
+        """Initialize decision variables for a grid and add constraints for basic logic
+
+        `allowed` restricts each row to some tiling indices and `digits` each cell to some
+        values; the other pattern and digit literals are created as constant false.
+        """
         nrow = len(grid)
         ncol = len(grid[0])
 
@@ -62,9 +186,17 @@ class Grid:
             return [[init(i, j) for j in J] for i in I]
 
         # Auxiliary variables
-        _tilings = list(get_tilings(ncol))
+        _tilings = tilings(ncol)
+        _allowed = allowed or [list(range(len(_tilings))) for _ in I]
+        _digits = digits or [[list(range(10)) for _ in J] for _ in I]
         _pattern = [
-            [model.NewBoolVar(f"t[{i}]={t}") for t, _ in enumerate(_tilings)] for i in I
+            [
+                model.NewBoolVar(f"t[{i}]={t}")
+                if t in _allowed[i]
+                else model.NewConstant(0)
+                for t, _ in enumerate(_tilings)
+            ]
+            for i in I
         ]
 
         _regions = set(region for row in grid for region in row)
@@ -73,9 +205,18 @@ class Grid:
         # Collect grids of underlying decision vars
         label = _grid_of(lambda i, j: _region_label[grid[i][j]])
         tiled = _grid_of(lambda i, j: model.NewBoolVar(f"z[{i},{j}]"))
-        value = _grid_of(lambda i, j: model.NewIntVar(0, 9, f"x[{i},{j}]"))
+        value = _grid_of(
+            lambda i, j: model.NewIntVarFromDomain(
+                cp_model.Domain.FromValues(_digits[i][j]), f"x[{i},{j}]"
+            )
+        )
         bools = _grid_of(
-            lambda i, j: [model.NewBoolVar(f"x[{i},{j}]={k}") for k in range(10)]
+            lambda i, j: [
+                model.NewBoolVar(f"x[{i},{j}]={k}")
+                if k in _digits[i][j]
+                else model.NewConstant(0)
+                for k in range(10)
+            ]
         )
 
         # Collect lists of all possible inflows and outflows from each cell (each flow is an auxiliary variable)
@@ -94,7 +235,7 @@ class Grid:
             total = label[i][j] + sum(incoming[i][j]) - sum(outgoing[i][j])
             model.Add(value[i][j] == total)
             model.AddExactlyOne(bools[i][j])
-            [model.Add(total == k).OnlyEnforceIf(bools[i][j][k]) for k in range(10)]
+            [model.Add(total == k).OnlyEnforceIf(bools[i][j][k]) for k in _digits[i][j]]
 
             # Tiled cell constraints
             [
@@ -119,21 +260,56 @@ class Grid:
         [model.Add(_region_label[i] != _region_label[j]) for i, j in _adjacencies(grid)]
 
         # Tiled cells cannot be joined by an edge
-        [
-            model.AddAtMostOne(tiled[i1][j], tiled[i2][j])
-            for j in J
-            for i1, i2 in pairwise(I)
-        ]
+        match encoding.rows:
+            case "cells":
+                [
+                    model.AddAtMostOne(tiled[i1][j], tiled[i2][j])
+                    for j in J
+                    for i1, i2 in pairwise(I)
+                ]
+            case "automaton":
+                # The state is the previous row's tiling, starting from an extra initial state
+                compatible = compatibility(ncol)
+                start = len(_tilings)
+                index = [model.NewIntVar(0, start - 1, f"pattern_{i}") for i in I]
+                [
+                    model.Add(index[i] == sum(t * p for t, p in enumerate(_pattern[i])))
+                    for i in I
+                ]
+                transitions = [(start, t, t) for t in range(start)] + [
+                    (s, t, t)
+                    for s, row in enumerate(compatible)
+                    for t, ok in enumerate(row)
+                    if ok
+                ]
+                model.AddAutomaton(index, start, list(range(start)), transitions)
 
         # Every row must have exactly one assigned tiling pattern
-        [model.AddExactlyOne(_pattern[i]) for i in I]
+        [model.AddExactlyOne(_pattern[i][t] for t in _allowed[i]) for i in I]
 
         # All row tilings must follow valid patterns
-        [
-            model.Add(tiled[i][j] == tiling_t.tiled[j]).OnlyEnforceIf(_pattern[i][t])
-            for t, tiling_t in enumerate(_tilings)
-            for i, j in product(I, J)
-        ]
+        match encoding.patterns:
+            case "reified":
+                [
+                    model.Add(tiled[i][j] == _tilings[t].tiled[j]).OnlyEnforceIf(
+                        _pattern[i][t]
+                    )
+                    for i, j in product(I, J)
+                    for t in _allowed[i]
+                ]
+            case "table":
+                # Each allowed tuple is a tiling mask followed by the one-hot pattern selector
+                [
+                    model.AddAllowedAssignments(
+                        tiled[i] + [_pattern[i][s] for s in _allowed[i]],
+                        [
+                            [int(x) for x in _tilings[t].tiled]
+                            + [int(t == s) for s in _allowed[i]]
+                            for t in _allowed[i]
+                        ],
+                    )
+                    for i in I
+                ]
 
         return cls(
             model=model,
@@ -145,32 +321,23 @@ class Grid:
             outgoing=outgoing,
             _tilings=_tilings,
             _pattern=_pattern,
+            _encoding=encoding,
+            _allowed=_allowed,
         )
 
 
 class DisplayCallback(cp_model.CpSolverSolutionCallback):
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, sink: "SolutionSink | None" = None):
         super().__init__()
         self.soln = 0
         self.grid = grid
-
-    def _show_cell(self, cell) -> str:
-        return str(self.Value(cell))
-
-    def _show_grid(self, grid: list[list]) -> None:
-        print(
-            "\n".join(" ".join(self._show_cell(cell) for cell in row) for row in grid)
-        )
+        self.sink = sink
 
     def OnSolutionCallback(self) -> None:
         self.soln += 1
-        print("soln", self.soln)
+        if self.sink is not None:
+            self.sink.record(self)
+            return
 
-        print("labels")
-        self._show_grid(self.grid.label)
-
-        print("tiled")
-        self._show_grid(self.grid.tiled)
-
-        print("value")
-        self._show_grid(self.grid.value)
+        print("soln", self.soln)
+        self.grid.show(self.Value)
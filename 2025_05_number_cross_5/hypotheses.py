@@ -0,0 +1,241 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from os import cpu_count
+from ortools.sat.python import cp_model
+
+from grid import Grid
+from puzzle import PuzzleSpec
+
+# The model of the current worker process, parsed once by `_init_worker`
+_model: cp_model.CpModel | None = None
+
+
+@dataclass
+class Hypothesis:
+    """A named partial assignment: cell digits, row tilings and region labels"""
+
+    name: str
+    values: dict[tuple[int, int], int] = field(default_factory=dict)
+    tilings: dict[int, list[int]] = field(default_factory=dict)  # row -> tiled columns
+    labels: dict[int, int] = field(default_factory=dict)  # region -> label
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Hypothesis":
+        """Reads {"name", "rows": {i: "4 . 0 ..."}, "tilings": {i: [j, ...]}, "labels": {r: k}}"""
+        return cls(
+            name=data["name"],
+            values={
+                (int(i), j): int(x)
+                for i, row in data.get("rows", {}).items()
+                for j, x in enumerate(row.split())
+                if x != "."
+            },
+            tilings={int(i): cols for i, cols in data.get("tilings", {}).items()},
+            labels={int(r): k for r, k in data.get("labels", {}).items()},
+        )
+
+
+@dataclass
+class Verdict:
+    name: str
+    status: str
+    wall_time: float
+    failing: list[str] = field(default_factory=list)  # assumptions sufficient to refute
+
+    def __str__(self) -> str:
+        failing = f" because {', '.join(self.failing)}" if self.failing else ""
+        return f"{self.wall_time:8.2f}s {self.status:<10} {self.name}{failing}"
+
+
+def load_hypotheses(path: str) -> list[Hypothesis]:
+    with open(path) as f:
+        return [Hypothesis.from_json(json.loads(line)) for line in f if line.strip()]
+
+
+def row_tiling_hypotheses(grid: Grid, i: int) -> list[Hypothesis]:
+    """One hypothesis per tiling row i may still take"""
+    return [
+        Hypothesis(f"row {i} tiles {cols}", tilings={i: cols})
+        for t in grid.allowed(i)
+        for cols in [[j for j, x in enumerate(grid._tilings[t].tiled) if x]]
+    ]
+
+
+def assumptions(
+    grid: Grid,
+    spec: PuzzleSpec,
+    hypothesis: Hypothesis,
+    model: cp_model.CpModel,
+    labels: dict[tuple[int, int], int],
+) -> list[tuple[str, int]]:
+    """Returns (description, literal index) pairs asserting a hypothesis on `model`, a clone of
+    the grid's model
+
+    Region labels are integers, so a half-reified literal is added to `model` for each distinct
+    (region, label) hypothesis and kept in `labels`; the rest are existing digit and pattern
+    literals.
+    """
+    nrow, ncol = len(grid.value), len(grid.value[0])
+    for (i, j), k in hypothesis.values.items():
+        if not (0 <= i < nrow and 0 <= j < ncol and 0 <= k <= 9):
+            raise ValueError(f"{hypothesis.name}: x[{i},{j}]={k} is not a cell digit")
+    literals = [
+        (f"x[{i},{j}]={k}", grid.bools[i][j][k].Index())
+        for (i, j), k in hypothesis.values.items()
+    ]
+    for i, cols in hypothesis.tilings.items():
+        t = next(
+            (
+                t
+                for t, tiling in enumerate(grid._tilings)
+                if [j for j, x in enumerate(tiling.tiled) if x] == cols
+            ),
+            None,
+        )
+        if t is None:
+            raise ValueError(f"{hypothesis.name}: {cols} is not a tiling of row {i}")
+        literals.append((f"row {i} tiles {cols}", grid._pattern[i][t].Index()))
+    for region, k in hypothesis.labels.items():
+        cell = next(
+            (
+                (i, j)
+                for i, row in enumerate(spec.regions)
+                for j, r in enumerate(row)
+                if r == region
+            ),
+            None,
+        )
+        if cell is None or not 1 <= k <= 9:
+            raise ValueError(
+                f"{hypothesis.name}: region {region} cannot be labelled {k}"
+            )
+        if (region, k) not in labels:
+            i, j = cell
+            literal = model.NewBoolVar(f"region[{region}]={k}")
+            label = model.GetIntVarFromProtoIndex(grid.label[i][j].Index())
+            model.Add(label == k).OnlyEnforceIf(literal)
+            labels[region, k] = literal.Index()
+        literals.append((f"region {region} is {k}", labels[region, k]))
+    return literals
+
+
+def _init_worker(model_bytes: bytes):
+    global _model
+    _model = cp_model.CpModel()
+    _model.Proto().ParseFromString(model_bytes)
+    _model.rebuild_var_and_constant_map()
+
+
+def _test(
+    name: str,
+    literals: list[tuple[str, int]],
+    time_limit: float | None,
+    workers: int,
+) -> Verdict:
+    assert _model is not None
+    _model.ClearAssumptions()
+    _model.AddAssumptions(
+        [_model.GetBoolVarFromProtoIndex(index) for _, index in literals]
+    )
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = workers
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(_model)
+
+    failing = []
+    if status == cp_model.INFEASIBLE:
+        core = set(solver.SufficientAssumptionsForInfeasibility())
+        failing = [description for description, index in literals if index in core]
+    status_name = (
+        "FEASIBLE" if status == cp_model.OPTIMAL else solver.StatusName(status)
+    )
+    return Verdict(name, status_name, solver.WallTime(), failing)
+
+
+def evaluate_hypotheses(
+    grid: Grid,
+    spec: PuzzleSpec,
+    hypotheses: list[Hypothesis],
+    processes: int = 2,
+    time_limit: float | None = None,
+) -> list[Verdict]:
+    """Tests each hypothesis as solver assumptions on one built model, in a process pool
+
+    The model is serialized once and parsed once per worker process. Each hypothesis is then
+    a solve under different assumptions, with the assumptions sufficient to refute it reported
+    when it is infeasible. Hypotheses on pruned (constant) literals are refuted without a solve.
+    """
+    # Label literals go on a clone, so the grid's own (cached) model never grows
+    model = grid.model.clone()
+    labels: dict[tuple[int, int], int] = {}
+    literals = [assumptions(grid, spec, h, model, labels) for h in hypotheses]
+    model_bytes = model.Proto().SerializeToString()
+    workers = max(1, (cpu_count() or 1) // processes)
+
+    # Literals pruned to constant false before the solve refute a hypothesis on their own
+    variables = model.Proto().variables
+    refuted = [
+        [d for d, index in lits if list(variables[index].domain) == [0, 0]]
+        for lits in literals
+    ]
+
+    with ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(model_bytes,)
+    ) as pool:
+        futures = [
+            None if fixed else pool.submit(_test, h.name, lits, time_limit, workers)
+            for h, lits, fixed in zip(hypotheses, literals, refuted)
+        ]
+        return [
+            Verdict(h.name, "INFEASIBLE", 0.0, fixed)
+            if future is None
+            else future.result()
+            for h, future, fixed in zip(hypotheses, futures, refuted)
+        ]
+
+
+def test_example_hypotheses():
+    from grid import Encoding
+    from puzzle import EXAMPLE, build_puzzle
+
+    grid = build_puzzle(cp_model.CpModel(), EXAMPLE, Encoding())
+    size = len(grid.model.Proto().variables), len(grid.model.Proto().constraints)
+    hypotheses = [
+        Hypothesis.from_json({"name": "solution", "rows": {"0": "5 5 0 8 8"}}),
+        Hypothesis.from_json({"name": "wrong digit", "rows": {"0": "5 5 0 8 9"}}),
+        Hypothesis("tiled", tilings={0: [2]}, labels={EXAMPLE.regions[0][0]: 5}),
+        Hypothesis("mislabelled", labels={EXAMPLE.regions[0][0]: 6}),
+    ]
+    verdicts = evaluate_hypotheses(grid, EXAMPLE, hypotheses, processes=2)
+
+    assert [v.status for v in verdicts] == ["FEASIBLE", "INFEASIBLE", "FEASIBLE"] + [
+        "INFEASIBLE"
+    ]
+    assert verdicts[1].failing and set(verdicts[1].failing) <= {
+        "x[0,0]=5",
+        "x[0,1]=5",
+        "x[0,2]=0",
+        "x[0,3]=8",
+        "x[0,4]=9",
+    }
+    assert verdicts[3].failing == [f"region {EXAMPLE.regions[0][0]} is 6"]
+    assert len(row_tiling_hypotheses(grid, 0)) == len(grid.allowed(0))
+    assert (
+        len(grid.model.Proto().variables),
+        len(grid.model.Proto().constraints),
+    ) == size
+
+    for bad in [
+        Hypothesis("off grid", values={(0, 99): 1}),
+        Hypothesis("not a digit", values={(0, 0): 10}),
+        Hypothesis("no region", labels={-1: 5}),
+    ]:
+        try:
+            evaluate_hypotheses(grid, EXAMPLE, [bad])
+        except ValueError as e:
+            assert str(e).startswith(f"{bad.name}: ")
+        else:
+            raise AssertionError(bad.name)
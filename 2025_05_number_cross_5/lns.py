@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from os import cpu_count
+from time import perf_counter
+from typing import Literal
+from ortools.sat.python import cp_model
+
+from grid import Encoding, Grid
+from puzzle import (
+    PuzzleSpec,
+    add_non_repeating_numbers_constraint,
+    add_row_constraint,
+    build_grid,
+    clue,
+)
+
+type Kind = Literal["band", "region", "highlight"]
+KINDS: tuple[Kind, ...] = ("band", "region", "highlight")
+
+# The soft model of the current worker process, parsed once by `_init_worker`
+_model: cp_model.CpModel | None = None
+
+
+def build_soft_puzzle(
+    model: cp_model.CpModel, spec: PuzzleSpec, encoding: Encoding = Encoding()
+) -> tuple[Grid, list[cp_model.IntVar]]:
+    """Builds a puzzle whose row clues may be broken, maximizing the number of rows satisfied
+
+    Every other rule stays hard, so any solution with all clues satisfied solves the puzzle.
+    Clue pre-filtering and the disjoint row pairs skipped by the non-repeating constraint both
+    assume every clue holds, so domains are built in full and every pair of rows is compared.
+    """
+    encoding = replace(encoding, domains="full")
+    grid = build_grid(model, spec, encoding)
+    satisfied = [model.NewBoolVar(f"clue[{i}]") for i, _ in enumerate(spec.clues)]
+    for i, spec_i in enumerate(spec.clues):
+        add_row_constraint(grid, i, clue(model, spec_i, encoding), satisfied[i])
+    add_non_repeating_numbers_constraint(grid, model, None)
+    model.Maximize(sum(satisfied))
+    return grid, satisfied
+
+
+class Incumbent(cp_model.CpSolverSolutionCallback):
+    """Records the value of every model variable at each solution, optionally stopping at the
+    first one"""
+
+    def __init__(self, variables: list[cp_model.IntVar], stop: bool = True):
+        super().__init__()
+        self.variables = variables
+        self.stop = stop
+        self.values: list[int] | None = None
+        self.objective = 0
+
+    def OnSolutionCallback(self) -> None:
+        self.values = [self.Value(var) for var in self.variables]
+        self.objective = int(self.ObjectiveValue())
+        if self.stop:
+            self.StopSearch()
+
+
+def neighbourhood(
+    kind: Kind,
+    spec: PuzzleSpec,
+    broken: list[int],
+    rng: random.Random,
+) -> set[tuple[int, int]]:
+    """Returns the cells freed by one neighbourhood, preferring those near broken rows
+
+    "band" is 2-3 consecutive rows, "region" every cell of one region and "highlight" the cells
+    within distance 2 of one highlighted cell.
+    """
+    nrow, ncol = len(spec.regions), len(spec.regions[0])
+    row = rng.choice(broken or range(nrow))
+    match kind:
+        case "band":
+            height = rng.choice([2, 3])
+            top = min(max(0, row - rng.randrange(height)), nrow - height)
+            return {(i, j) for i in range(top, top + height) for j in range(ncol)}
+        case "region":
+            region = spec.regions[row][rng.randrange(ncol)]
+            return {
+                (i, j)
+                for i in range(nrow)
+                for j in range(ncol)
+                if spec.regions[i][j] == region
+            }
+        case "highlight":
+            highlights = [
+                (i, j)
+                for i in range(nrow)
+                for j in range(ncol)
+                if spec.highlights[i][j]
+            ]
+            r, c = min(highlights or [(row, 0)], key=lambda ij: abs(ij[0] - row))
+            if highlights and rng.random() < 0.5:
+                r, c = rng.choice(highlights)
+            return {
+                (i, j)
+                for i in range(nrow)
+                for j in range(ncol)
+                if abs(i - r) + abs(j - c) <= 2
+            }
+
+
+def _init_worker(model_bytes: bytes):
+    global _model
+    _model = cp_model.CpModel()
+    _model.Proto().ParseFromString(model_bytes)
+    _model.rebuild_var_and_constant_map()
+
+
+def _repair(
+    incumbent: list[int],
+    fixed: list[int],
+    time_limit: float,
+    seed: int,
+    workers: int,
+) -> tuple[int, list[int]] | None:
+    """Re-solves the worker's model with the `fixed` variables pinned to the incumbent"""
+    assert _model is not None
+    model = _model.clone()
+    model.ClearHints()  # the spec's hints would duplicate the incumbent's
+    proto = model.Proto()
+    for index in fixed:
+        proto.variables[index].domain[:] = [incumbent[index], incumbent[index]]
+    proto.solution_hint.vars.extend(range(len(incumbent)))
+    proto.solution_hint.values.extend(incumbent)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.random_seed = seed
+    solver.parameters.num_workers = workers
+    status = solver.Solve(model)
+    if status == cp_model.MODEL_INVALID:
+        raise ValueError(f"Invalid repair model: {model.Validate()}")
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return int(solver.ObjectiveValue()), list(solver.ResponseProto().solution)
+
+
+@dataclass
+class LnsResult:
+    rows: int
+    objective: int | None = None  # rows whose clue is satisfied by the incumbent
+    elapsed: float = 0.0
+    rounds: int = 0
+    history: list[tuple[float, int, str]] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.objective}/{self.rows} clues in {self.elapsed:.2f}s"
+            f" after {self.rounds} rounds"
+        )
+
+
+def solve_lns(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    time_limit: float = 60.0,
+    round_limit: float = 5.0,
+    processes: int = 2,
+    seed: int = 0,
+) -> LnsResult:
+    """Improves a first solution of the soft puzzle by large-neighbourhood search
+
+    Each round frees one neighbourhood per worker process (cycling through KINDS), pins every
+    other cell value to the incumbent and re-solves for at most `round_limit` seconds. The best
+    result is kept if it satisfies at least as many clues. Every len(KINDS) rounds without an
+    improvement, one more neighbourhood is merged into each freed set.
+    """
+    model = cp_model.CpModel()
+    grid, satisfied = build_soft_puzzle(model, spec, encoding)
+    proto = model.Proto()
+    variables = [model.GetIntVarFromProtoIndex(k) for k in range(len(proto.variables))]
+    result = LnsResult(len(satisfied))
+
+    start = perf_counter()
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    incumbent = Incumbent(variables)
+    solver.Solve(model, incumbent)
+    if incumbent.values is None:
+        result.elapsed = perf_counter() - start
+        return result
+    values, objective = incumbent.values, incumbent.objective
+    result.history.append((perf_counter() - start, objective, "first"))
+
+    rng = random.Random(seed)
+    stalled = 0
+    workers = max(1, (cpu_count() or 1) // processes)
+    with ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(proto.SerializeToString(),)
+    ) as pool:
+        while objective < len(satisfied):
+            left = time_limit - (perf_counter() - start)
+            if left <= 0:
+                break
+            broken = [i for i, x in enumerate(satisfied) if not values[x.Index()]]
+            kinds = [KINDS[(result.rounds + k) % len(KINDS)] for k in range(processes)]
+            futures = []
+            for kind in kinds:
+                free = set().union(
+                    *(
+                        neighbourhood(
+                            KINDS[(KINDS.index(kind) + m) % len(KINDS)],
+                            spec,
+                            broken,
+                            rng,
+                        )
+                        for m in range(1 + stalled // len(KINDS))
+                    )
+                )
+                fixed = [
+                    grid.value[i][j].Index()
+                    for i, row in enumerate(grid.value)
+                    for j, _ in enumerate(row)
+                    if (i, j) not in free
+                ]
+                limit = min(round_limit, left)
+                seed_k = rng.randrange(1 << 30)
+                futures.append(
+                    pool.submit(_repair, values, fixed, limit, seed_k, workers)
+                )
+
+            result.rounds += 1
+            repairs = [
+                (repair, kind)
+                for future, kind in zip(futures, kinds)
+                if (repair := future.result()) is not None
+            ]
+            stalled += 1
+            if repairs:
+                (best, repaired), kind = max(repairs, key=lambda r: r[0][0])
+                if best > objective:
+                    result.history.append((perf_counter() - start, best, kind))
+                    stalled = 0
+                if best >= objective:
+                    values, objective = repaired, best
+
+    result.objective = objective
+    result.elapsed = perf_counter() - start
+    return result
+
+
+def synthetic_spec(n: int, seed: int = 0) -> PuzzleSpec:
+    """Generates an n x n puzzle: about n connected regions grown from random seeds, about n
+    highlighted cells and a random clue per row
+
+    Clues are drawn from those without catalogued members, whose tables grow with the length.
+    """
+    rng = random.Random(seed)
+    cells = [(i, j) for i in range(n) for j in range(n)]
+    regions = [[-1] * n for _ in range(n)]
+    frontier = []
+    for region, (i, j) in enumerate(rng.sample(cells, n)):
+        regions[i][j] = region
+        frontier.append((i, j))
+    while frontier:
+        i, j = frontier.pop(rng.randrange(len(frontier)))
+        for r, c in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]:
+            if 0 <= r < n and 0 <= c < n and regions[r][c] < 0:
+                regions[r][c] = regions[i][j]
+                frontier.append((r, c))
+
+    marked = set(rng.sample(cells, n))
+    highlights = [[(i, j) in marked for j in range(n)] for i in range(n)]
+
+    def random_clue() -> str:
+        match rng.choice(["div", "rem", "odd", "self-dividing"]):
+            case "div":
+                return f"div:{rng.randrange(2, 100)}"
+            case "rem":
+                divisor = rng.randrange(2, 20)
+                return f"rem:{divisor}:{rng.randrange(divisor)}"
+            case kind:
+                return kind
+
+    return PuzzleSpec(regions, highlights, [random_clue() for _ in range(n)])
+
+
+def test_lns():
+    from puzzle import EXAMPLE
+
+    result = solve_lns(EXAMPLE, Encoding(), time_limit=30, round_limit=1, processes=1)
+    assert result.objective == len(EXAMPLE.clues)
+
+    spec = synthetic_spec(6, seed=1)
+    assert len(spec.regions) == len(spec.clues) == 6
+    assert all(x >= 0 for row in spec.regions for x in row)
+
+    _, satisfied = build_soft_puzzle(cp_model.CpModel(), spec)
+    assert len(satisfied) == 6
+
+    # A repair of a hinted puzzle replaces the spec's hints with the incumbent
+    hinted = replace(EXAMPLE, hint=[[5, 5, 0, 8, 8]] + [[None] * 5] * 4)
+    model = cp_model.CpModel()
+    build_soft_puzzle(model, hinted)
+    proto = model.Proto()
+    solver = cp_model.CpSolver()
+    solver.Solve(model)
+    _init_worker(proto.SerializeToString())
+    repair = _repair(list(solver.ResponseProto().solution), [], 10, 0, 1)
+    assert repair is not None and repair[0] == len(EXAMPLE.clues)
+    broken = [0, 5]
+    for kind in KINDS:
+        free = neighbourhood(kind, spec, broken, random.Random(0))
+        assert free and all(0 <= i < 6 and 0 <= j < 6 for i, j in free)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser("Number Cross 5 large-neighbourhood search")
+    parser.add_argument("sizes", type=int, nargs="+", help="synthetic grid sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=120.0)
+    parser.add_argument("--round-limit", type=float, default=5.0)
+    parser.add_argument("--processes", type=int, default=2)
+    for option, choices in Encoding.choices().items():
+        parser.add_argument(
+            f"--{option}", choices=choices, default=getattr(Encoding(), option)
+        )
+    args = parser.parse_args()
+    encoding = Encoding(
+        **{option: getattr(args, option) for option in Encoding.choices()}
+    )
+
+    for n in args.sizes:
+        spec = synthetic_spec(n, args.seed)
+        print(f"{n}x{n} (seed {args.seed}): {' '.join(spec.clues)}")
+
+        model = cp_model.CpModel()
+        build_soft_puzzle(model, spec, encoding)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = args.time_limit
+        status = solver.Solve(model)
+        objective = (
+            int(solver.ObjectiveValue())
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+            else None
+        )
+        print(
+            f"  plain {objective}/{n} clues in {solver.WallTime():.2f}s"
+            f" {solver.StatusName(status)}"
+        )
+
+        result = solve_lns(
+            spec,
+            encoding,
+            args.time_limit,
+            args.round_limit,
+            args.processes,
+            args.seed,
+        )
+        print(f"  lns   {result}")
+        print("  " + " ".join(f"{t:.1f}s:{x}({k})" for t, x, k in result.history))
@@ -0,0 +1,177 @@
+import hashlib
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable
+import ortools
+from ortools.sat.python import cp_model
+
+from grid import Encoding, Grid
+from puzzle import PuzzleSpec
+from utils.tiling import tilings
+
+HERE = Path(__file__).parent
+CACHE_DIR = HERE / ".cache" / "models"
+MAX_BYTES = 1 << 30
+
+# Changes to any of these (or to the ortools version) invalidate every cached model
+SOURCES = [
+    HERE / "grid.py",
+    HERE / "puzzle.py",
+    HERE / "build_profile.py",
+    *sorted((HERE / "utils").glob("*.py")),
+    *sorted((HERE.parent / "lib").glob("*.py")),
+]
+
+# Grid fields holding (nested lists of) variables, stored as proto indices
+FIELDS = ["label", "tiled", "value", "bools", "incoming", "outgoing", "_pattern"]
+
+
+def cache_key(spec: PuzzleSpec, encoding: Encoding = Encoding()) -> str:
+    """Hashes everything a built model depends on: the puzzle spec, encoding, build sources and
+    ortools version"""
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            {
+                "spec": asdict(spec),
+                "encoding": asdict(encoding),
+                "ortools": ortools.__version__,
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    for path in SOURCES:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """Stores built models on disk as a serialized CpModel proto plus a variable index map
+
+    Entries are named by `cache_key`, so a changed input simply misses. Loading an entry
+    refreshes its modification time, and storing one evicts the least recently used entries
+    until the cache fits in `max_bytes`.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.root / f"{key}.pb", self.root / f"{key}.json"
+
+    def load(self, key: str) -> Grid | None:
+        proto_path, index_path = self._paths(key)
+        if not (proto_path.exists() and index_path.exists()):
+            return None
+
+        model = cp_model.CpModel()
+        model.Proto().ParseFromString(proto_path.read_bytes())
+        model.rebuild_var_and_constant_map()
+        index = json.loads(index_path.read_text())
+
+        def var(i: int) -> cp_model.IntVar:
+            return model.GetIntVarFromProtoIndex(i)
+
+        def nested(x):
+            return [nested(y) for y in x] if isinstance(x, list) else var(x)
+
+        [path.touch() for path in (proto_path, index_path)]
+        return Grid(
+            model=model,
+            **{name: nested(index[name]) for name in FIELDS},
+            _tilings=tilings(len(index["value"][0])),
+            _encoding=Encoding(**index["encoding"]),
+            _active={(i, s, n): var(v) for i, s, n, v in index["_active"]},
+            _allowed=index["_allowed"],
+        )
+
+    def store(self, key: str, grid: Grid) -> None:
+        def nested(x):
+            return [nested(y) for y in x] if isinstance(x, list) else x.Index()
+
+        index = {name: nested(getattr(grid, name)) for name in FIELDS}
+        index["encoding"] = asdict(grid._encoding)
+        index["_active"] = [[*k, v.Index()] for k, v in grid._active.items()]
+        index["_allowed"] = grid._allowed
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        proto_path, index_path = self._paths(key)
+        proto_path.write_bytes(grid.model.Proto().SerializeToString())
+        index_path.write_text(json.dumps(index))
+        self.evict()
+
+    def invalidate(self, key: str) -> bool:
+        """Removes one entry, returning whether it existed"""
+        paths = [path for path in self._paths(key) if path.exists()]
+        [path.unlink() for path in paths]
+        return bool(paths)
+
+    def clear(self) -> int:
+        """Removes every entry, returning the number of files deleted"""
+        paths = list(self.root.glob("*.pb")) + list(self.root.glob("*.json"))
+        [path.unlink() for path in paths]
+        return len(paths)
+
+    def evict(self) -> list[str]:
+        """Removes least recently used entries until the cache fits, returning their keys"""
+        entries = sorted(
+            self.root.glob("*.pb"), key=lambda path: path.stat().st_mtime, reverse=True
+        )
+        evicted = []
+        total = 0
+        for proto_path in entries:
+            index_path = proto_path.with_suffix(".json")
+            size = proto_path.stat().st_size + (
+                index_path.stat().st_size if index_path.exists() else 0
+            )
+            total += size
+            if total > self.max_bytes:
+                self.invalidate(proto_path.stem)
+                evicted.append(proto_path.stem)
+        return evicted
+
+    def build(
+        self,
+        spec: PuzzleSpec,
+        encoding: Encoding,
+        build: Callable[[cp_model.CpModel, PuzzleSpec, Encoding], Grid],
+    ) -> Grid:
+        """Loads the model for a spec and encoding, building and storing it on a miss"""
+        key = cache_key(spec, encoding)
+        if (grid := self.load(key)) is not None:
+            print(f"Loaded cached model {key[:12]}")
+            return grid
+
+        grid = build(cp_model.CpModel(), spec, encoding)
+        self.store(key, grid)
+        print(f"Cached model {key[:12]}")
+        return grid
+
+
+def test_model_cache(tmp_path):
+    from puzzle import EXAMPLE, build_puzzle
+
+    cache = ModelCache(tmp_path)
+    encoding = Encoding(patterns="table", uniqueness="spans")
+    built = cache.build(EXAMPLE, encoding, build_puzzle)
+    loaded = cache.build(EXAMPLE, encoding, build_puzzle)
+
+    assert loaded.model.Proto() == built.model.Proto()
+    assert [[x.Index() for x in row] for row in loaded.value] == [
+        [x.Index() for x in row] for row in built.value
+    ]
+    assert loaded._active.keys() == built._active.keys()
+    assert loaded._allowed == built._allowed
+
+    solver = cp_model.CpSolver()
+    assert solver.Solve(loaded.model) == cp_model.OPTIMAL
+
+    assert cache.invalidate(cache_key(EXAMPLE, encoding))
+    assert cache.load(cache_key(EXAMPLE, encoding)) is None
+
+    cache.store("a", built)
+    cache.store("b", built)
+    cache.max_bytes = 1
+    assert sorted(cache.evict()) == ["a", "b"]
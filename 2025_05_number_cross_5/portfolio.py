@@ -0,0 +1,119 @@
+import multiprocessing as mp
+from dataclasses import dataclass
+from os import cpu_count
+from queue import Empty
+from time import perf_counter
+from ortools.sat import cp_model_pb2, sat_parameters_pb2
+from ortools.sat.python import cp_model
+
+BRANCHINGS = [
+    "AUTOMATIC_SEARCH",
+    "FIXED_SEARCH",
+    "PORTFOLIO_SEARCH",
+    "PSEUDO_COST_SEARCH",
+    "PORTFOLIO_WITH_QUICK_RESTART_SEARCH",
+]
+
+# Statuses that end the race: a solution for this (objective-free) model, or a proof of none
+CONCLUSIVE = {cp_model.OPTIMAL, cp_model.INFEASIBLE}
+
+
+@dataclass
+class Result:
+    config: dict
+    status: str = "CANCELLED"
+    wall_time: float = 0.0
+    values: list[int] | None = None
+    won: bool = False
+
+    def __str__(self) -> str:
+        config = " ".join(f"{k}={v}" for k, v in self.config.items())
+        flag = "*" if self.won else " "
+        return f"{flag} {self.wall_time:8.2f}s {self.status:<10} {config}"
+
+
+def portfolio_configs(n: int) -> list[dict]:
+    """Returns n distinct solver configurations, sharing the available cores between them"""
+    workers = max(1, (cpu_count() or 1) // n)
+    return [
+        {
+            "search_branching": BRANCHINGS[k % len(BRANCHINGS)],
+            "linearization_level": (k // len(BRANCHINGS)) % 3,
+            "random_seed": k,
+            "num_workers": workers,
+        }
+        for k in range(n)
+    ]
+
+
+def _solve_worker(
+    index: int,
+    config: dict,
+    model_bytes: bytes,
+    time_limit: float | None,
+    results: mp.Queue,
+):
+    model = cp_model.CpModel()
+    model.Proto().ParseFromString(model_bytes)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.MergeFrom(sat_parameters_pb2.SatParameters(**config))
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+
+    status = solver.Solve(model)
+    values = list(solver.ResponseProto().solution) or None
+    results.put((index, status, solver.WallTime(), values))
+
+
+def solve_portfolio(
+    model: cp_model.CpModel,
+    configs: list[dict],
+    time_limit: float | None = None,
+) -> list[Result]:
+    """Races one worker process per solver configuration on the same model
+
+    The first worker to find a solution or prove infeasibility wins and the others are
+    terminated. Results are returned in the order of `configs`.
+    """
+    model_bytes = model.Proto().SerializeToString()
+    results = [Result(config) for config in configs]
+    queue = mp.Queue()
+
+    start = perf_counter()
+    workers = [
+        mp.Process(
+            target=_solve_worker,
+            args=(index, config, model_bytes, time_limit, queue),
+            daemon=True,
+        )
+        for index, config in enumerate(configs)
+    ]
+    [worker.start() for worker in workers]
+
+    pending = set(range(len(workers)))
+    while pending:
+        try:
+            index, status, wall_time, values = queue.get(timeout=1)
+        except Empty:
+            # Workers that die without reporting (e.g. killed by the OS) are given up on
+            for i in [i for i in pending if not workers[i].is_alive()]:
+                pending.discard(i)
+                results[i].status = "FAILED"
+                results[i].wall_time = perf_counter() - start
+            continue
+
+        pending.discard(index)
+        results[index].status = cp_model_pb2.CpSolverStatus.Name(status)
+        results[index].wall_time = wall_time
+        results[index].values = values
+        if status in CONCLUSIVE:
+            results[index].won = True
+            break
+
+    for index in pending:
+        workers[index].terminate()
+        results[index].wall_time = perf_counter() - start
+    [worker.join() for worker in workers]
+
+    return results
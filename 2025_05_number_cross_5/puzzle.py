@@ -1,87 +1,149 @@
-from typing import Callable, Iterable, Sequence
+import logging
+from dataclasses import dataclass
+from itertools import combinations, product
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
 from ortools.sat.python import cp_model
 
-from grid import Grid
-from utils.series import fibonacci, primes, squares
+from build_profile import profiled, profiled_clue
+from grid import DisplayCallback, Encoding, Grid
+from utils import digit_products
+from utils.automata import Automaton, remainder_automaton, self_dividing_automata
+from utils.clue_sets import RowDomain, disjoint_rows, row_domain, sharing_cliques
+from utils.parser import parse_puzzle
+from utils.series import SIEVE, digit_trie, digit_words
+from utils.tiling import tilings
+
+if TYPE_CHECKING:
+    from solution_sink import Format
+
+log = logging.getLogger(__name__)
 
 
 # Puzzle definitions
-def example_puzzle(model: cp_model.CpModel, solver: cp_model.CpSolver):
+def example_puzzle(
+    model: cp_model.CpModel,
+    solver: cp_model.CpSolver,
+    encoding: Encoding = Encoding(),
+    sink_path: str | None = None,
+    sink_format: "Format" = "jsonl",
+):
     """Model the example problem to understand how tractable this problem is"""
+    grid = build_example_puzzle(model, encoding)
+    solve_grid(grid, solver, sink_path, sink_format)
 
-    grid = Grid.from_regions(
-        model=model,
-        grid=[
-            [int(x) for x in row.split()]
-            for row in [
-                "0 0 0 0 0",
-                "1 0 0 0 0",
-                "1 1 0 0 0",
-                "2 1 1 0 0",
-                "2 2 1 1 0",
-            ]
-        ],
-        highlights=[
-            [x != "." for x in row.split()]
-            for row in [
-                "x x . . .",
-                "x . . . .",
-                ". . . . .",
-                ". . . . x",
-                ". . . x x",
-            ]
-        ],
-    )
 
-    add_row_constraint(grid, 0, ensure_divisible_by(model, 11))
-    add_row_constraint(grid, 1, ensure_divisible_by(model, 14))
-    add_row_constraint(grid, 2, ensure_divisible_by(model, 28))
-    add_row_constraint(grid, 3, ensure_divisible_by(model, 101))
-    add_row_constraint(grid, 4, ensure_divisible_by(model, 2025))
+def actual_puzzle(
+    model: cp_model.CpModel,
+    solver: cp_model.CpSolver,
+    encoding: Encoding = Encoding(),
+    sink_path: str | None = None,
+    sink_format: "Format" = "jsonl",
+):
+    grid = build_actual_puzzle(model, encoding)
+
+    print("Solving")
+    solve_grid(grid, solver, sink_path, sink_format)
 
-    status = solver.Solve(model, solution_callback=grid.display_callback)
+
+def solve_grid(
+    grid: Grid,
+    solver: cp_model.CpSolver,
+    sink_path: str | None = None,
+    sink_format: "Format" = "jsonl",
+):
+    """Solves a grid, printing solutions or recording them to a file if a sink path is given"""
+    if sink_path is None:
+        status = solver.Solve(grid.model, solution_callback=grid.display_callback)
+    else:
+        with grid.solution_sink(sink_path, sink_format) as sink:
+            callback = DisplayCallback(grid, sink)
+            status = solver.Solve(grid.model, solution_callback=callback)
     print(solver.StatusName(status))
 
 
-def actual_puzzle(model: cp_model.CpModel, solver: cp_model.CpSolver):
-    grid = Grid.from_regions(
-        model=model,
-        grid=[
-            [int(x) for x in row.split()]
-            for row in [
-                "0 0 0 0 0 0 0 0 0 0 0",
-                "0 1 0 0 0 0 0 0 0 0 0",
-                "1 1 2 2 2 2 3 3 3 0 3",
-                "1 2 2 1 2 4 3 3 3 3 3",
-                "1 2 2 1 2 4 4 3 3 4 3",
-                "1 1 1 1 1 4 4 4 4 4 3",
-                "1 5 6 6 1 1 4 4 6 4 4",
-                "1 5 6 6 6 6 6 6 6 7 7",
-                "5 5 5 5 6 5 6 7 7 7 7",
-                "5 5 5 5 5 5 5 5 5 5 5",
-                "5 5 8 8 8 8 8 8 5 5 5",
-            ]
-        ],
-        highlights=[
-            [x != "." for x in row.split()]
-            for row in [
-                ". . . . . . . . . . .",
-                ". . . x x . . . . . .",
-                ". . . . x . . . . x .",
-                ". . . . . . . . x x .",
-                ". . . . . . . . . . .",
-                ". . . . . x . . . . .",
-                ". x x . . x x . . . .",
-                ". x . . . x . . . . .",
-                ". . . . x x . . . . .",
-                ". . . . x . . . . . .",
-                ". . . . . . . . . . .",
-            ]
-        ],
-    )
+# Puzzle models
+@dataclass
+class PuzzleSpec:
+    """The inputs of a puzzle: region labels, highlighted cells and one clue spec per row"""
+
+    regions: list[list[int]]
+    highlights: list[list[bool]]
+    clues: list[str]
+    hint: list[list[int | None]] | None = None
+
+
+EXAMPLE = PuzzleSpec(
+    regions=[
+        [int(x) for x in row.split()]
+        for row in [
+            "0 0 0 0 0",
+            "1 0 0 0 0",
+            "1 1 0 0 0",
+            "2 1 1 0 0",
+            "2 2 1 1 0",
+        ]
+    ],
+    highlights=[
+        [x != "." for x in row.split()]
+        for row in [
+            "x x . . .",
+            "x . . . .",
+            ". . . . .",
+            ". . . . x",
+            ". . . x x",
+        ]
+    ],
+    clues=["div:11", "div:14", "div:28", "div:101", "div:2025"],
+)
 
+ACTUAL = PuzzleSpec(
+    regions=[
+        [int(x) for x in row.split()]
+        for row in [
+            "0 0 0 0 0 0 0 0 0 0 0",
+            "0 1 0 0 0 0 0 0 0 0 0",
+            "1 1 2 2 2 2 3 3 3 0 3",
+            "1 2 2 1 2 4 3 3 3 3 3",
+            "1 2 2 1 2 4 4 3 3 4 3",
+            "1 1 1 1 1 4 4 4 4 4 3",
+            "1 5 6 6 1 1 4 4 6 4 4",
+            "1 5 6 6 6 6 6 6 6 7 7",
+            "5 5 5 5 6 5 6 7 7 7 7",
+            "5 5 5 5 5 5 5 5 5 5 5",
+            "5 5 8 8 8 8 8 8 5 5 5",
+        ]
+    ],
+    highlights=[
+        [x != "." for x in row.split()]
+        for row in [
+            ". . . . . . . . . . .",
+            ". . . x x . . . . . .",
+            ". . . . x . . . . x .",
+            ". . . . . . . . x x .",
+            ". . . . . . . . . . .",
+            ". . . . . x . . . . .",
+            ". x x . . x x . . . .",
+            ". x . . . x . . . . .",
+            ". . . . x x . . . . .",
+            ". . . . x . . . . . .",
+            ". . . . . . . . . . .",
+        ]
+    ],
+    clues=[
+        "square",
+        "product:20",
+        "div:13",
+        "div:32",
+        "self-dividing",
+        "product:25",
+        "self-dividing",
+        "odd-palindrome",
+        "fibonacci",
+        "product:2025",
+        "rem:2:1",
+    ],
     # Prophylactic solution for row 11 inferred after exploring solver solution for first 10 rows 🙂 ↕️
-    hint = [
+    hint=[
         [int(x) if x != "." else None for x in row.split()]
         for row in [
             ". . . . . . . . . . .",
@@ -96,35 +158,121 @@ def actual_puzzle(model: cp_model.CpModel, solver: cp_model.CpSolver):
             ". . . . . . . . . . .",
             "0 4 7 0 8 8 7 0 4 3 3",
         ]
-    ]
+    ],
+)
 
-    assert all(
-        int(n) in primes(1000) for n in "".join(map(str, hint[10])).split("0") if n
+
+def load_puzzle(path: str) -> PuzzleSpec:
+    """Reads a puzzle file of regions, highlights (marked 0) and one clue spec per row"""
+    with open(path) as f:
+        puzzle = parse_puzzle(f.read())
+    if len(puzzle.clues) != puzzle.nrow:
+        raise ValueError(
+            f"{path}: expected {puzzle.nrow} clues, got {len(puzzle.clues)}"
+        )
+    regions = [[x for x in row if x is not None] for row in puzzle.regions]
+    if any(len(row) != puzzle.ncol for row in regions):
+        raise ValueError(f"{path}: every region cell must be a digit")
+    return PuzzleSpec(
+        regions=regions,
+        highlights=[[x is not None for x in row] for row in puzzle.highlights],
+        clues=puzzle.clues,
     )
 
+
+def build_grid(
+    model: cp_model.CpModel, spec: PuzzleSpec, encoding: Encoding = Encoding()
+) -> Grid:
+    """Builds the grid logic of a puzzle (regions, tilings, hints) without any clue"""
+    domains = prefilter_rows(spec) if encoding.domains == "clues" else None
+    grid = Grid.from_regions(
+        model=model,
+        grid=spec.regions,
+        highlights=spec.highlights,
+        encoding=encoding,
+        allowed=None if domains is None else [domain.tilings for domain in domains],
+        digits=None if domains is None else [domain.digits for domain in domains],
+    )
+
+    add_hints(grid, spec.hint or [])
+    return grid
+
+
+def add_hints(grid: Grid, hint: list[list[int | None]]):
+    """Hints the value and digit literal of every cell given a digit"""
     for i, row in enumerate(hint):
         for j, k in enumerate(row):
             if k is not None:
-                model.AddHint(grid.value[i][j], k)
-                model.AddHint(grid.bools[i][j][k], True)
+                grid.model.AddHint(grid.value[i][j], k)
+                grid.model.AddHint(grid.bools[i][j][k], True)
+
+
+def build_puzzle(
+    model: cp_model.CpModel, spec: PuzzleSpec, encoding: Encoding = Encoding()
+) -> Grid:
+    grid = build_grid(model, spec, encoding)
 
     print("Adding constraints")
-    add_row_constraint(grid, 0, ensure_square(model))
-    add_row_constraint(grid, 1, ensure_product_is(model, 20))
-    add_row_constraint(grid, 2, ensure_divisible_by(model, 13))
-    add_row_constraint(grid, 3, ensure_divisible_by(model, 32))
-    add_row_constraint(grid, 4, ensure_self_dividing(model))
-    add_row_constraint(grid, 5, ensure_product_is(model, 25))
-    add_row_constraint(grid, 6, ensure_self_dividing(model))
-    add_row_constraint(grid, 7, ensure_odd_palindrome(model))
-    add_row_constraint(grid, 8, ensure_fibonacci(model))
-    add_row_constraint(grid, 9, ensure_product_is(model, 2025))
-    add_row_constraint(grid, 10, ensure_remainder(model, 2, 1))
-    add_non_repeating_numbers_constraint(grid, model)
+    for i, spec_i in enumerate(spec.clues):
+        add_row_constraint(grid, i, clue(model, spec_i, encoding))
+    lengths = [length for _, length in grid.spans]
+    add_non_repeating_numbers_constraint(
+        grid, model, disjoint_rows(spec.clues, lengths)
+    )
 
-    print("Solving")
-    status = solver.Solve(model, solution_callback=grid.display_callback)
-    print(solver.StatusName(status))
+    return grid
+
+
+def prefilter_rows(spec: PuzzleSpec) -> list[RowDomain]:
+    """Narrows each row to the tilings and digits its clue allows, before any variable exists"""
+    _tilings = tilings(len(spec.regions[0]))
+    domains = [
+        row_domain(clue_i, _tilings, highlights_i)
+        for clue_i, highlights_i in zip(spec.clues, spec.highlights)
+    ]
+    for i, (clue_i, domain) in enumerate(zip(spec.clues, domains)):
+        log.info(
+            f"Row {i} ({clue_i}): {len(domain.tilings)}/{len(_tilings)} tilings,"
+            f" {sum(map(len, domain.digits))}/{10 * len(domain.digits)} cell values"
+        )
+    return domains
+
+
+def build_example_puzzle(
+    model: cp_model.CpModel, encoding: Encoding = Encoding()
+) -> Grid:
+    return build_puzzle(model, EXAMPLE, encoding)
+
+
+def build_actual_puzzle(
+    model: cp_model.CpModel, encoding: Encoding = Encoding()
+) -> Grid:
+    return build_puzzle(model, ACTUAL, encoding)
+
+
+def clue(model: cp_model.CpModel, spec: str, encoding: Encoding = Encoding()):
+    """Returns the constraint generator for a clue spec of the form name[:arg[:arg]]"""
+    match spec.split(":"):
+        case ["square"]:
+            return ensure_square(model, encoding)
+        case ["fibonacci"]:
+            return ensure_fibonacci(model, encoding)
+        case ["prime"]:
+            return ensure_prime(model, encoding)
+        case ["product", target]:
+            return ensure_product_is(model, int(target), encoding)
+        case ["div", divisor]:
+            return ensure_divisible_by(model, int(divisor), encoding)
+        case ["rem", divisor, remainder]:
+            return ensure_remainder(model, int(divisor), int(remainder), encoding)
+        case ["odd"]:
+            return ensure_odd(model, encoding)
+        case ["self-dividing"]:
+            return ensure_self_dividing(model, encoding)
+        case ["odd-palindrome"]:
+            return ensure_odd_palindrome(model, encoding)
+        case _:
+            raise ValueError(f"Unknown clue: {spec}")
 
 
 # Variable manipulation helpers
@@ -136,7 +284,15 @@ def as_digits(number: int) -> list[int]:
     return digits[::-1]
 
 
+def as_number(digits: Sequence[cp_model.IntVar]) -> cp_model.LinearExpr:
+    n = len(digits)
+    return cp_model.LinearExpr.WeightedSum(
+        digits, [10 ** (n - i - 1) for i in range(n)]
+    )
+
+
 # Constraints
+@profiled(row=lambda grid, i, *_: i)
 def add_row_constraint(
     grid: Grid,
     i: int,
@@ -144,33 +300,66 @@ def add_row_constraint(
         [Sequence[cp_model.IntVar], Sequence[list[cp_model.IntVar]]],
         Iterable[cp_model.Constraint],
     ],
+    enforce: cp_model.IntVar | None = None,
 ):
-    """Adds optional constraints to all un-tiled numbers in a row"""
-    [
-        constraint.OnlyEnforceIf(grid._pattern[i][t])
-        for t, tiling_t in enumerate(grid._tilings)
-        for group in tiling_t.groups
-        for constraint in get_constraints(
-            [grid.value[i][j] for j in group.cells],
-            [grid.bools[i][j] for j in group.cells],
-        )
-    ]
+    """Adds optional constraints to all un-tiled numbers in a row, all also enforced by
+    `enforce` if given (to make the clue soft)"""
+    extra = [] if enforce is None else [enforce]
+    match grid._encoding.clues:
+        case "tilings":
+            [
+                constraint.OnlyEnforceIf(grid._pattern[i][t], *extra)
+                for t in grid.allowed(i)
+                for group in grid._tilings[t].groups
+                for constraint in get_constraints(
+                    [grid.value[i][j] for j in group.cells],
+                    [grid.bools[i][j] for j in group.cells],
+                )
+            ]
+        case "spans":
+            [
+                constraint.OnlyEnforceIf(grid.span_active(i, start, length), *extra)
+                for start, length in grid.row_spans(i)
+                for constraint in get_constraints(
+                    grid.value[i][start : start + length],
+                    grid.bools[i][start : start + length],
+                )
+            ]
 
 
-def add_non_repeating_numbers_constraint(grid: Grid, model: cp_model.CpModel):
-    """Adds constraints to ensure un-tiled numbers do not repeat in the grid"""
+@profiled()
+def add_non_repeating_numbers_constraint(
+    grid: Grid,
+    model: cp_model.CpModel,
+    disjoint: set[tuple[int, int, int]] | None = None,
+):
+    """Adds constraints to ensure un-tiled numbers do not repeat in the grid
 
-    def as_number(digits: list[cp_model.IntVar]):
-        n = len(digits)
-        return sum(d * 10 ** (n - i - 1) for i, d in enumerate(digits))
+    Rows i1 < i2 with (length, i1, i2) in `disjoint` (see utils.clue_sets.disjoint_rows) can
+    never hold the same number of that length, so no constraint is posted between them.
+    """
+    match grid._encoding.uniqueness:
+        case "pairwise":
+            add_pairwise_non_repeating_numbers_constraint(grid, model, disjoint)
+        case "spans":
+            add_span_non_repeating_numbers_constraint(grid, model, disjoint)
+
+
+@profiled()
+def add_pairwise_non_repeating_numbers_constraint(
+    grid: Grid,
+    model: cp_model.CpModel,
+    disjoint: set[tuple[int, int, int]] | None = None,
+):
+    """Enforces uniqueness between every pair of groups of every pair of row tilings"""
 
     # Enforce uniqueness within rows
     [
         constraint.OnlyEnforceIf(grid._pattern[i][t])
         for i, row in enumerate(grid.value)
-        for t, tiling_t in enumerate(grid._tilings)
-        for a, g1 in enumerate(tiling_t.groups)
-        for b, g2 in enumerate(tiling_t.groups)
+        for t in grid.allowed(i)
+        for a, g1 in enumerate(grid._tilings[t].groups)
+        for b, g2 in enumerate(grid._tilings[t].groups)
         if a < b
         for constraint in [
             model.Add(
@@ -180,122 +369,229 @@ def add_non_repeating_numbers_constraint(grid: Grid, model: cp_model.CpModel):
         ]
     ]
 
-    # Enforce uniqueness between rows
-    [
-        constraint.OnlyEnforceIf(grid._pattern[i1][t1], grid._pattern[i2][t2])
-        for i1, row1 in enumerate(grid.value)
-        for i2, row2 in enumerate(grid.value)
-        if i1 < i2
-        for t1, tiling_t1 in enumerate(grid._tilings)
-        for g1 in tiling_t1.groups
-        for t2, tiling_t2 in enumerate(grid._tilings)
-        for g2 in tiling_t2.groups
-        for constraint in [
-            model.Add(
-                as_number([row1[j] for j in g1.cells])
-                != as_number([row2[j] for j in g2.cells])
+    # Enforce uniqueness between rows, skipping groups that can never be equal
+    disjoint = disjoint or set()
+    total = kept = 0
+    for i1, i2 in combinations(range(len(grid.value)), 2):
+        groups1 = [(t, g) for t in grid.allowed(i1) for g in grid._tilings[t].groups]
+        groups2 = [(t, g) for t in grid.allowed(i2) for g in grid._tilings[t].groups]
+        total += len(groups1) * len(groups2)
+        for (t1, g1), (t2, g2) in product(groups1, groups2):
+            length = len(g1.cells)
+            if length == len(g2.cells) and (length, i1, i2) not in disjoint:
+                model.Add(
+                    as_number([grid.value[i1][j] for j in g1.cells])
+                    != as_number([grid.value[i2][j] for j in g2.cells])
+                ).OnlyEnforceIf(grid._pattern[i1][t1], grid._pattern[i2][t2])
+                kept += 1
+    log.info(f"Skipped {total - kept} of {total} cross-row != constraints")
+
+
+@profiled()
+def add_span_non_repeating_numbers_constraint(
+    grid: Grid,
+    model: cp_model.CpModel,
+    disjoint: set[tuple[int, int, int]] | None = None,
+):
+    """Enforces uniqueness between one canonical number per distinct (row, start, length) span
+
+    Numbers of different lengths can never be equal (untiled digits are non-zero), so spans are
+    bucketed by length. Inactive spans take a distinct negative sentinel so that each bucket is a
+    single AllDifferent constraint, or one per clique of rows that may share a number when some
+    rows are `disjoint`.
+    """
+    buckets: dict[int, list[tuple[int, cp_model.IntVar]]] = {}
+    for i, row in enumerate(grid.value):
+        for start, length in grid.row_spans(i):
+            active = grid.span_active(i, start, length)
+            sentinel = -1 - len(buckets.setdefault(length, []))
+            number = model.NewIntVarFromDomain(
+                cp_model.Domain.FromIntervals(
+                    [[sentinel, sentinel], [10 ** (length - 1), 10**length - 1]]
+                ),
+                f"n[{i},{start}:{start + length}]",
             )
-        ]
-    ]
-
-
-def ensure_is_one_of(model: cp_model.CpModel, candidates: Sequence[list[int]]):
+            model.Add(number == as_number(row[start : start + length])).OnlyEnforceIf(
+                active
+            )
+            model.Add(number == sentinel).OnlyEnforceIf(active.Not())
+            buckets[length].append((i, number))
+
+    skipped = total = 0
+    for length, numbers in buckets.items():
+        covered = set()
+        for clique in sharing_cliques(len(grid.value), length, disjoint or set()):
+            members = [
+                (k, number) for k, (i, number) in enumerate(numbers) if i in clique
+            ]
+            model.AddAllDifferent([number for _, number in members])
+            covered |= {(a, b) for (a, _), (b, _) in combinations(members, 2)}
+        total += len(numbers) * (len(numbers) - 1) // 2
+        skipped += len(numbers) * (len(numbers) - 1) // 2 - len(covered)
+    log.info(f"Skipped {skipped} of {total} span pairs between disjoint clue sets")
+
+
+@profiled_clue
+def ensure_is_one_of(
+    model: cp_model.CpModel,
+    candidates: Sequence[Sequence[int]],
+    encoding: Encoding = Encoding(),
+):
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
     ) -> Iterable[cp_model.Constraint]:
-        auxs = []
-        for target in filter(lambda x: len(x) == len(digits), candidates):
-            aux = model.NewBoolVar("")
-            for b, x in zip(bools, target):
-                model.Add(b[x] == True).OnlyEnforceIf(aux)
-            auxs.append(aux)
+        targets = [x for x in candidates if len(x) == len(digits)]
+
+        match encoding.candidates:
+            case "bools":
+                auxs = []
+                for target in targets:
+                    aux = model.NewBoolVar("")
+                    for b, x in zip(bools, target):
+                        model.Add(b[x] == True).OnlyEnforceIf(aux)
+                    auxs.append(aux)
+
+                yield model.AddBoolOr(auxs)
 
-        yield model.AddBoolOr(auxs)
+            case "table":
+                yield model.AddAllowedAssignments(digits, targets)
 
     return get_constraints
 
 
-def ensure_is_in_series(model: cp_model.CpModel, series: Callable[[int], list[int]]):
+@profiled_clue
+def ensure_is_in_series(
+    model: cp_model.CpModel,
+    name: str,
+    encoding: Encoding = Encoding(),
+):
+    """Constrains the digits to a member of a catalogued series (see utils.catalog)"""
+
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
     ) -> Iterable[cp_model.Constraint]:
-        targets = [as_digits(x) for x in series(10 ** len(digits))]
-        yield from ensure_is_one_of(model, targets)(digits, bools)
+        match encoding.series:
+            case "candidates":
+                targets = digit_words(name, len(digits))
+                yield from ensure_is_one_of(model, targets, encoding)(digits, bools)
+
+            case "automaton":
+                dfa = digit_trie(name, len(digits)).automaton
+                yield from ensure_accepted(model, [dfa])(digits, bools)
 
     return get_constraints
 
 
-def ensure_square(model: cp_model.CpModel):
-    return ensure_is_in_series(model, squares)
+@profiled_clue
+def ensure_square(model: cp_model.CpModel, encoding: Encoding = Encoding()):
+    return ensure_is_in_series(model, "squares", encoding)
 
 
-def ensure_fibonacci(model: cp_model.CpModel):
-    return ensure_is_in_series(model, fibonacci)
+@profiled_clue
+def ensure_fibonacci(model: cp_model.CpModel, encoding: Encoding = Encoding()):
+    return ensure_is_in_series(model, "fibonacci", encoding)
 
 
-def ensure_prime(model: cp_model.CpModel):
-    return ensure_is_in_series(model, primes)
+@profiled_clue
+def ensure_prime(model: cp_model.CpModel, encoding: Encoding = Encoding()):
+    return ensure_is_in_series(model, "primes", encoding)
 
 
-def ensure_product_is(model: cp_model.CpModel, target: int):
-    def assignments(n: int, target: int) -> list[list[int]]:
-        if n == 0:
-            return [[]] if target == 1 else []
-        result = []
-        for d in range(1, 10):
-            if target % d == 0:
-                for rest in assignments(n - 1, target // d):
-                    result.append([d] + rest)
-        return result
+@profiled_clue
+def ensure_product_is(
+    model: cp_model.CpModel, target: int, encoding: Encoding = Encoding()
+):
+    def get_constraints(
+        digits: Sequence[cp_model.IntVar],
+        bools: Sequence[list[cp_model.IntVar]],
+    ) -> Iterable[cp_model.Constraint]:
+        candidates = digit_products.table(len(digits), target).tolist()
+        yield from ensure_is_one_of(model, candidates, encoding)(digits, bools)
+
+    return get_constraints
+
 
+@profiled_clue
+def ensure_accepted(model: cp_model.CpModel, automata: Sequence[Automaton]):
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
     ) -> Iterable[cp_model.Constraint]:
-        candidates = assignments(len(digits), target)
-        yield from ensure_is_one_of(model, candidates)(digits, bools)
+        switch = model.NewBoolVar("")
+        for automaton in automata:
+            dfa = automaton.trim(len(digits)).optional
+            model.AddAutomaton(
+                [switch, *digits], dfa.start, dfa.finals, dfa.transitions
+            )
+        yield model.Add(switch == 1)
 
     return get_constraints
 
 
-def ensure_remainder(model: cp_model.CpModel, divisor: int, remainder: int):
+@profiled_clue
+def ensure_remainder(
+    model: cp_model.CpModel,
+    divisor: int,
+    remainder: int,
+    encoding: Encoding = Encoding(),
+):
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
     ) -> Iterable[cp_model.Constraint]:
-        n = len(digits)
-        x = sum(d_i * 10 ** (n - i - 1) for i, d_i in enumerate(digits))
-        quotient = model.NewIntVar(1, 10**n - 1, "")
-        yield model.Add(x == divisor * quotient + remainder)
+        match encoding.remainders:
+            case "linear":
+                n = len(digits)
+                x = sum(d_i * 10 ** (n - i - 1) for i, d_i in enumerate(digits))
+                quotient = model.NewIntVar(1, 10**n - 1, "")
+                yield model.Add(x == divisor * quotient + remainder)
+
+            case "automaton":
+                dfa = remainder_automaton(divisor, remainder)
+                yield from ensure_accepted(model, [dfa])(digits, bools)
 
     return get_constraints
 
 
-def ensure_divisible_by(model: cp_model.CpModel, divisor: int):
-    return ensure_remainder(model, divisor, 0)
+@profiled_clue
+def ensure_divisible_by(
+    model: cp_model.CpModel, divisor: int, encoding: Encoding = Encoding()
+):
+    return ensure_remainder(model, divisor, 0, encoding)
 
 
-def ensure_odd(model: cp_model.CpModel):
-    return ensure_remainder(model, 2, 1)
+@profiled_clue
+def ensure_odd(model: cp_model.CpModel, encoding: Encoding = Encoding()):
+    return ensure_remainder(model, 2, 1, encoding)
 
 
-def ensure_self_dividing(model: cp_model.CpModel):
+@profiled_clue
+def ensure_self_dividing(model: cp_model.CpModel, encoding: Encoding = Encoding()):
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
     ) -> Iterable[cp_model.Constraint]:
-        for divisor in range(2, 10):
-            aux = model.NewBoolVar("")
-            model.Add(sum(b[divisor] for b in bools) <= aux * len(bools))
-            for constraint in ensure_divisible_by(model, divisor)(digits, bools):
-                yield constraint.OnlyEnforceIf(aux)
+        match encoding.remainders:
+            case "linear":
+                for divisor in range(2, 10):
+                    aux = model.NewBoolVar("")
+                    model.Add(sum(b[divisor] for b in bools) <= aux * len(bools))
+                    for constraint in ensure_divisible_by(model, divisor, encoding)(
+                        digits, bools
+                    ):
+                        yield constraint.OnlyEnforceIf(aux)
+
+            case "automaton":
+                dfas = self_dividing_automata()
+                yield from ensure_accepted(model, dfas)(digits, bools)
 
     return get_constraints
 
 
-def ensure_odd_palindrome(model: cp_model.CpModel):
+@profiled_clue
+def ensure_odd_palindrome(model: cp_model.CpModel, encoding: Encoding = Encoding()):
     def get_constraints(
         digits: Sequence[cp_model.IntVar],
         bools: Sequence[list[cp_model.IntVar]],
@@ -303,11 +599,20 @@ def ensure_odd_palindrome(model: cp_model.CpModel):
         n = len(digits)
         for i in range(n // 2):
             yield model.Add(digits[i] == digits[n - i - 1])
-        yield from ensure_odd(model)(digits, bools)
+        yield from ensure_odd(model, encoding)(digits, bools)
 
     return get_constraints
 
 
+def test_actual_hint():
+    assert ACTUAL.hint is not None
+    assert all(
+        SIEVE.count(int(n), int(n) + 1) == 1
+        for n in "".join(map(str, ACTUAL.hint[10])).split("0")
+        if n
+    )
+
+
 if __name__ == "__main__":
     model = cp_model.CpModel()
     solver = cp_model.CpSolver()
@@ -1,23 +1,154 @@
 #!/usr/bin/env python
 
+import json
+import logging
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Literal
 from ortools.sat.python import cp_model
-from puzzle import actual_puzzle, example_puzzle
+from build_profile import profiling
+from grid import Encoding, Grid
+from hypotheses import evaluate_hypotheses, load_hypotheses, row_tiling_hypotheses
+from model_cache import ModelCache
+from portfolio import portfolio_configs, solve_portfolio
+from puzzle import (
+    ACTUAL,
+    EXAMPLE,
+    PuzzleSpec,
+    build_puzzle,
+    load_puzzle,
+    solve_grid,
+)
+from staged import solve_staged
 
+if TYPE_CHECKING:
+    from solution_sink import Format
 
-def solve_example():
-    model = cp_model.CpModel()
+
+def load_or_build(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    cache: ModelCache | None = None,
+) -> Grid:
+    if cache is None:
+        return build_puzzle(cp_model.CpModel(), spec, encoding)
+    return cache.build(spec, encoding, build_puzzle)
+
+
+def solve(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    sink_path: str | None = None,
+    sink_format: "Format" = "jsonl",
+    cache: ModelCache | None = None,
+):
+    grid = load_or_build(spec, encoding, cache)
     solver = cp_model.CpSolver()
     solver.parameters.log_to_stdout = True
     solver.parameters.log_search_progress = True
-    example_puzzle(model, solver)
 
+    print("Solving")
+    solve_grid(grid, solver, sink_path, sink_format)
+
+
+def race_portfolio(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    workers: int = 2,
+    time_limit: float | None = None,
+    cache: ModelCache | None = None,
+):
+    grid = load_or_build(spec, encoding, cache)
+
+    print(f"Racing {workers} solver configurations")
+    results = solve_portfolio(grid.model, portfolio_configs(workers), time_limit)
+    print("\n".join(map(str, results)))
+
+    values = next((result.values for result in results if result.won), None)
+    if values:
+        grid.show(lambda var: values[var.Index()])
+
+
+def hypothesize(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    path: str | None = None,
+    row: int | None = None,
+    processes: int = 2,
+    time_limit: float | None = None,
+    cache: ModelCache | None = None,
+):
+    """Tests hypotheses from a JSONL file and/or every remaining tiling of a row on one model"""
+    grid = load_or_build(spec, encoding, cache)
+    hypotheses = load_hypotheses(path) if path else []
+    if row is not None:
+        hypotheses += row_tiling_hypotheses(grid, row)
+
+    print(f"Testing {len(hypotheses)} hypotheses in {processes} processes")
+    for verdict in evaluate_hypotheses(grid, spec, hypotheses, processes, time_limit):
+        print(verdict)
+
+
+def solve_in_stages(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    start: int = 1,
+    mode: Literal["fix", "hint"] = "fix",
+    time_limit: float | None = None,
+):
+    print(f"Solving in stages from {start} rows ({mode} solved rows)")
+    result = solve_staged(spec, encoding, start, mode, time_limit)
+    total = sum(stage.wall_time for stage in result.stages)
+    print(f"{result.status} after {len(result.stages)} stages in {total:.2f}s")
+    if result.solver is not None and result.status == "OPTIMAL":
+        result.grid.show(result.solver.Value)
+
+
+def solve_batch(
+    paths: list[str],
+    encoding: Encoding = Encoding(),
+    time_limit: float | None = None,
+    cache: ModelCache | None = None,
+):
+    """Solves every puzzle file in one process, sharing series, tiling and clue tables
+
+    Directories are expanded to the `*.txt` files they contain.
+    """
+    files = [
+        file
+        for path in map(Path, paths)
+        for file in (sorted(path.glob("*.txt")) if path.is_dir() else [path])
+    ]
 
-def solve_actual():
+    start = perf_counter()
+    for file in files:
+        t0 = perf_counter()
+        with redirect_stdout(sys.stderr):
+            grid = load_or_build(load_puzzle(str(file)), encoding, cache)
+
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        status = solver.Solve(grid.model)
+
+        print(f"{file}: {solver.StatusName(status)} in {perf_counter() - t0:.2f}s")
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            grid.show(solver.Value)
+
+    elapsed = perf_counter() - start
+    print(
+        f"Solved {len(files)} puzzles in {elapsed:.2f}s"
+        f" ({60 * len(files) / elapsed:.1f} puzzles/min)"
+    )
+
+
+def profile_build(spec: PuzzleSpec, encoding: Encoding = Encoding()) -> dict:
     model = cp_model.CpModel()
-    solver = cp_model.CpSolver()
-    solver.parameters.log_to_stdout = True
-    solver.parameters.log_search_progress = True
-    actual_puzzle(model, solver)
+    with profiling(model) as profiler, redirect_stdout(sys.stderr):
+        build_puzzle(model, spec, encoding)
+    return profiler.report()
 
 
 def main():
@@ -26,18 +157,158 @@ def main():
     parser = ArgumentParser("Number Cross 5")
     parser.add_argument("-m", "--main", action="store_true")
     parser.add_argument("-t", "--test", action="store_true")
+    parser.add_argument(
+        "--batch",
+        metavar="PATH",
+        nargs="+",
+        help="solve puzzle files (or directories of them) with a clue spec per row",
+    )
+    parser.add_argument(
+        "--profile-build",
+        metavar="PATH",
+        nargs="?",
+        const="-",
+        help="build models without solving and write a JSON profile (default: stdout)",
+    )
+    parser.add_argument(
+        "--portfolio",
+        metavar="N",
+        type=int,
+        help="race N solver processes with different parameters, keeping the first to finish",
+    )
+    parser.add_argument(
+        "--hypotheses",
+        metavar="PATH",
+        help="test the partial assignments in a JSONL file as assumptions on one model",
+    )
+    parser.add_argument(
+        "--hypothesize-row",
+        metavar="ROW",
+        type=int,
+        help="test every remaining tiling of a row as a hypothesis",
+    )
+    parser.add_argument(
+        "--staged",
+        choices=["fix", "hint"],
+        help="add one row clue per stage, fixing (with backtracking) or hinting solved rows",
+    )
+    parser.add_argument(
+        "--stage-start",
+        metavar="K",
+        type=int,
+        default=1,
+        help="number of rows in the first stage",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=2,
+        help="worker processes for hypothesis testing",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        help="time limit in seconds for each portfolio, batch, hypothesis or stage solve",
+    )
+    parser.add_argument(
+        "--sink",
+        metavar="PATH",
+        help="record solutions to a file from a background thread instead of printing them",
+    )
+    parser.add_argument("--sink-format", choices=["jsonl", "binary"], default="jsonl")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always build models instead of loading them from the model cache",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="delete every cached model before running",
+    )
+    for option, choices in Encoding.choices().items():
+        parser.add_argument(
+            f"--{option}", choices=choices, default=getattr(Encoding(), option)
+        )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    encoding = Encoding(
+        **{option: getattr(args, option) for option in Encoding.choices()}
+    )
+
+    cache = None if args.no_cache else ModelCache()
+    if args.clear_cache:
+        print(f"Cleared {ModelCache().clear()} cached model files")
+
+    if args.batch:
+        solve_batch(args.batch, encoding, args.time_limit, cache)
+        return
 
     if not (args.test or args.main):
         print("Nothing will run. Try passing --test or --main to trigger a solve")
 
+    if args.profile_build:
+        reports = {}
+        if args.test:
+            reports["example"] = profile_build(EXAMPLE, encoding)
+        if args.main:
+            reports["actual"] = profile_build(ACTUAL, encoding)
+
+        if args.profile_build == "-":
+            json.dump(reports, sys.stdout, indent=2)
+        else:
+            with open(args.profile_build, "w") as f:
+                json.dump(reports, f, indent=2)
+        return
+
+    if args.hypotheses or args.hypothesize_row is not None:
+        for flag, name, spec in [
+            (args.test, "TEST", EXAMPLE),
+            (args.main, "MAIN", ACTUAL),
+        ]:
+            if flag:
+                print(f"{name}: Testing hypotheses")
+                hypothesize(
+                    spec,
+                    encoding,
+                    args.hypotheses,
+                    args.hypothesize_row,
+                    args.processes,
+                    args.time_limit,
+                    cache,
+                )
+        return
+
+    if args.staged:
+        if args.test:
+            print("TEST: Solving the example puzzle in stages")
+            solve_in_stages(
+                EXAMPLE, encoding, args.stage_start, args.staged, args.time_limit
+            )
+        if args.main:
+            print("MAIN: Solving the actual puzzle in stages")
+            solve_in_stages(
+                ACTUAL, encoding, args.stage_start, args.staged, args.time_limit
+            )
+        return
+
+    if args.portfolio:
+        if args.test:
+            print("TEST: Racing solvers on the example puzzle")
+            race_portfolio(EXAMPLE, encoding, args.portfolio, args.time_limit, cache)
+        if args.main:
+            print("MAIN: Racing solvers on the actual puzzle")
+            race_portfolio(ACTUAL, encoding, args.portfolio, args.time_limit, cache)
+        return
+
     if args.test:
         print("TEST: Solving the example puzzle")
-        solve_example()
+        solve(EXAMPLE, encoding, args.sink, args.sink_format, cache)
 
     if args.main:
         print("MAIN: Solving the actual puzzle")
-        solve_actual()
+        solve(ACTUAL, encoding, args.sink, args.sink_format, cache)
 
 
 if __name__ == "__main__":
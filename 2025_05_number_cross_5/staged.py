@@ -0,0 +1,139 @@
+from dataclasses import dataclass, field
+from typing import Literal
+from ortools.sat.python import cp_model
+
+from grid import Encoding, Grid
+from puzzle import (
+    PuzzleSpec,
+    add_hints,
+    add_non_repeating_numbers_constraint,
+    add_row_constraint,
+    build_grid,
+    clue,
+    disjoint_rows,
+)
+
+type Mode = Literal["fix", "hint"]
+
+
+@dataclass
+class Stage:
+    rows: int  # rows whose clues are in the model
+    fixed: int  # leading rows fixed to the previous solution
+    status: str
+    wall_time: float
+
+    def __str__(self) -> str:
+        return (
+            f"rows {self.rows:>2} fixed {self.fixed:>2}"
+            f" {self.status:<10} {self.wall_time:8.2f}s"
+        )
+
+
+@dataclass
+class StagedResult:
+    grid: Grid
+    stages: list[Stage] = field(default_factory=list)
+    values: list[list[int]] | None = None  # the last solution found, all rows
+    solver: cp_model.CpSolver | None = None  # the solver that found it
+
+    @property
+    def status(self) -> str:
+        return self.stages[-1].status if self.stages else "UNKNOWN"
+
+
+def solve_staged(
+    spec: PuzzleSpec,
+    encoding: Encoding = Encoding(),
+    start: int = 1,
+    mode: Mode = "fix",
+    time_limit: float | None = None,
+) -> StagedResult:
+    """Solves a puzzle by adding one row clue at a time to a single model
+
+    Stage k solves the clues of the first k rows. In "fix" mode, the rows solved by the previous
+    stage are fixed with solver assumptions; when a stage is infeasible, the fixed rows get a
+    no-good clause and the stage is retried with one fewer row fixed. Every clause rules out an
+    assignment that is infeasible under a subset of the final constraints, so none are ever
+    retracted. In "hint" mode, the previous stage's rows are only hinted and nothing is fixed.
+    """
+    model = cp_model.CpModel()
+    grid = build_grid(model, spec, encoding)
+    lengths = [length for _, length in grid.spans]
+    add_non_repeating_numbers_constraint(
+        grid, model, disjoint_rows(spec.clues, lengths)
+    )
+
+    result = StagedResult(grid)
+    nrow = len(grid.value)
+    k, fixed, added = max(1, min(start, nrow)), 0, 0
+    while True:
+        for i in range(added, k):
+            add_row_constraint(grid, i, clue(model, spec.clues[i], encoding))
+        added = k
+
+        model.ClearAssumptions()
+        if result.values is not None and mode == "fix":
+            model.AddAssumptions(
+                [
+                    grid.bools[i][j][x]
+                    for i in range(fixed)
+                    for j, x in enumerate(result.values[i])
+                ]
+            )
+        elif result.values is not None:
+            # Hint the solved rows, keeping the spec's own hints for the rest
+            model.ClearHints()
+            hints: list[list[int | None]] = [
+                list(spec.hint[i]) if spec.hint else [None for _ in grid.value[i]]
+                for i in range(nrow)
+            ]
+            hints[: k - 1] = [list(row) for row in result.values[: k - 1]]
+            add_hints(grid, hints)
+
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        status = solver.Solve(model)
+        stage = Stage(k, fixed, solver.StatusName(status), solver.WallTime())
+        result.stages.append(stage)
+        print(stage, flush=True)
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            result.values = [[solver.Value(x) for x in row] for row in grid.value]
+            result.solver = solver
+            if k == nrow:
+                return result
+            fixed = k if mode == "fix" else 0
+            k += 1
+        elif status == cp_model.INFEASIBLE and fixed > 0 and result.values is not None:
+            # Backtrack: this prefix has no completion under the current clues
+            model.AddBoolOr(
+                [
+                    grid.bools[i][j][x].Not()
+                    for i in range(fixed)
+                    for j, x in enumerate(result.values[i])
+                ]
+            )
+            fixed -= 1
+        else:
+            return result
+
+
+def test_solve_staged():
+    from puzzle import EXAMPLE
+
+    fixed = solve_staged(EXAMPLE, Encoding(), mode="fix")
+    hinted = solve_staged(EXAMPLE, Encoding(), mode="hint")
+    assert fixed.status == hinted.status == "OPTIMAL"
+    assert fixed.values == hinted.values
+    assert fixed.values is not None and fixed.values[0] == [5, 5, 0, 8, 8]
+    assert [stage.rows for stage in hinted.stages] == [1, 2, 3, 4, 5]
+    assert any(stage.status == "INFEASIBLE" for stage in fixed.stages)
+
+    # A prefix with no completion is ruled out and the stage retried with fewer rows fixed
+    assert all(
+        b.fixed == a.fixed - 1
+        for a, b in zip(fixed.stages, fixed.stages[1:])
+        if a.status == "INFEASIBLE"
+    )
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from math import gcd, lcm
+from typing import Callable, Iterable
+
+DIGITS = range(1, 10)  # untiled cells never hold a zero
+
+
+@dataclass(frozen=True)
+class Automaton:
+    """A DFA over decimal digits, read from the most significant digit"""
+
+    start: int
+    finals: list[int]
+    transitions: list[tuple[int, int, int]]  # (tail, label, head)
+
+    @cached_property
+    def states(self) -> int:
+        return 1 + max(
+            (max(tail, head) for tail, _, head in self.transitions),
+            default=self.start,
+        )
+
+    @cached_property
+    def _step(self) -> dict[tuple[int, int], int]:
+        return {(tail, label): head for tail, label, head in self.transitions}
+
+    @cached_property
+    def _trimmed(self) -> dict[int, "Automaton"]:
+        return {}
+
+    def run(self, digits: Iterable[int]) -> int | None:
+        """Returns the state reached after reading the digits, or None if the DFA gets stuck"""
+        state = self.start
+        for d in digits:
+            if (state, d) not in self._step:
+                return None
+            state = self._step[state, d]
+        return state
+
+    def accepts(self, digits: Iterable[int]) -> bool:
+        return self.run(digits) in self.finals
+
+    def trim(self, length: int) -> "Automaton":
+        """Keeps only transitions used by some accepted word of exactly `length` digits"""
+        if length not in self._trimmed:
+            forward = [{self.start}]
+            for _ in range(length):
+                forward.append({h for t, _, h in self.transitions if t in forward[-1]})
+
+            backward = [set(self.finals)]
+            for _ in range(length):
+                backward.append(
+                    {t for t, _, h in self.transitions if h in backward[-1]}
+                )
+
+            self._trimmed[length] = Automaton(
+                start=self.start,
+                finals=self.finals,
+                transitions=[
+                    (t, label, h)
+                    for t, label, h in self.transitions
+                    if any(
+                        t in forward[k] and h in backward[length - k - 1]
+                        for k in range(length)
+                    )
+                ],
+            )
+        return self._trimmed[length]
+
+    @cached_property
+    def optional(self) -> "Automaton":
+        """Prefixes the automaton with a switch: 1 runs the automaton, 0 accepts any digits
+
+        CP-SAT does not support enforcement literals on automaton constraints, so the switch is
+        fed in as the first variable and enforced in its place.
+        """
+        switch = self.states
+        bypass = self.states + 1
+        return Automaton(
+            start=switch,
+            finals=[*self.finals, bypass],
+            transitions=[
+                *self.transitions,
+                (switch, 1, self.start),
+                (switch, 0, bypass),
+                *((bypass, d, bypass) for d in range(10)),
+            ],
+        )
+
+
+def residue_automaton(
+    modulus: int,
+    accept: Callable[[int, int], bool],
+    divides: bool = False,
+) -> Automaton:
+    """Builds a left-to-right DFA tracking the number read so far modulo `modulus`
+
+    States are (residue, g) pairs. When `divides` is set, g is the lcm of gcd(d, modulus) over
+    all digits d read so far, otherwise it stays 1. Accepting states are those for which
+    accept(residue, g) holds. Only states reachable from the start are generated.
+    """
+    index: dict[tuple[int, int], int] = {(0, 1): 0}
+    transitions = []
+    queue = [(0, 1)]
+    while queue:
+        r, g = tail = queue.pop()
+        for d in DIGITS:
+            head = ((10 * r + d) % modulus, lcm(g, gcd(d, modulus)) if divides else g)
+            if head not in index:
+                index[head] = len(index)
+                queue.append(head)
+            transitions.append((index[tail], d, index[head]))
+
+    finals = [state for (r, g), state in index.items() if accept(r, g)]
+    return Automaton(start=0, finals=finals, transitions=transitions)
+
+
+@lru_cache
+def remainder_automaton(divisor: int, remainder: int) -> Automaton:
+    """Accepts numbers x with x % divisor == remainder"""
+    return residue_automaton(divisor, lambda r, _: r == remainder % divisor)
+
+
+@lru_cache
+def self_dividing_automata() -> list[Automaton]:
+    """Accepts numbers divisible by each of their digits, one DFA per prime power of 2520
+
+    The lcm of any set of digits divides 2520 = 8 * 9 * 5 * 7, so by the CRT a number is divisible
+    by it iff it is divisible by its gcd with each prime power. Tracking (residue, digit lcm)
+    modulo each prime power separately needs 80 states in total instead of 2520 * 48.
+    """
+    return [
+        residue_automaton(m, lambda r, g: r % g == 0, divides=True)
+        for m in (8, 9, 5, 7)
+    ]
+
+
+def test_remainder_automaton():
+    from itertools import product
+
+    for divisor, remainder in [(2, 1), (13, 0), (32, 0), (2025, 0), (7, 3)]:
+        dfa = remainder_automaton(divisor, remainder)
+        for digits in product(DIGITS, repeat=3):
+            x = int("".join(map(str, digits)))
+            assert dfa.accepts(digits) == (x % divisor == remainder)
+
+
+def test_self_dividing_automata():
+    dfas = self_dividing_automata()
+    for x in range(1, 100_000):
+        digits = [int(d) for d in str(x)]
+        if 0 in digits:
+            continue
+        expected = all(x % d == 0 for d in digits)
+        assert all(dfa.accepts(digits) for dfa in dfas) == expected
+
+
+def test_optional():
+    dfa = remainder_automaton(13, 0).optional
+    assert dfa.accepts([1, 1, 3])
+    assert not dfa.accepts([1, 1, 4])
+    assert dfa.accepts([0, 1, 4])
+    assert dfa.accepts([0, 0, 0])
+
+
+def test_trim():
+    from itertools import product
+
+    dfa = remainder_automaton(2025, 0)
+    assert not dfa.trim(3).transitions
+    assert len(dfa.trim(5).transitions) < len(dfa.transitions)
+    for digits in product(DIGITS, repeat=5):
+        assert dfa.trim(5).accepts(digits) == dfa.accepts(digits)
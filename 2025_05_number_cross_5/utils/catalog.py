@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from math import isqrt
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from utils import digit_products, series
+from utils.lib import digit_dp
+
+CATALOG_DIR = Path(__file__).parent.parent / ".cache" / "catalog"
+
+
+def zero_free(xs: np.ndarray) -> np.ndarray:
+    """Keeps the numbers without a zero digit, the only ones an untiled group can hold"""
+    keep = np.ones(len(xs), dtype=bool)
+    rest = xs.copy()
+    while rest.any():
+        keep &= (rest % 10 != 0) | (rest == 0)
+        rest //= 10
+    return xs[keep]
+
+
+def all_zero_free(length: int) -> np.ndarray:
+    """Returns every number of `length` non-zero digits in ascending order"""
+    xs = np.zeros(1, dtype=np.int64)
+    for _ in range(length):
+        xs = (10 * xs[:, None] + np.arange(1, 10)).ravel()
+    return xs
+
+
+def squares(length: int) -> np.ndarray:
+    lo, hi = isqrt(10 ** (length - 1) - 1) + 1, isqrt(10**length - 1) + 1
+    roots = np.arange(lo, hi, dtype=np.int64)
+    return zero_free(roots * roots)
+
+
+def fibonacci(length: int) -> np.ndarray:
+    xs = np.array(series.fibonacci(10**length), dtype=np.int64)
+    return zero_free(np.unique(xs[xs >= 10 ** (length - 1)]))
+
+
+def primes(length: int) -> np.ndarray:
+    chunks = series.SIEVE.between(10 ** (length - 1), 10**length)
+    return np.concatenate([np.empty(0, np.int64), *map(zero_free, chunks)])
+
+
+def self_dividing(length: int) -> np.ndarray:
+    chunks = digit_dp.between(10 ** (length - 1), 10**length)
+    return np.concatenate([np.empty(0, np.int64), *chunks])
+
+
+def odd_palindromes(length: int) -> np.ndarray:
+    half = all_zero_free((length + 1) // 2)
+    digits = (half[:, None] // 10 ** np.arange((length + 1) // 2)[::-1]) % 10
+    mirrored = np.concatenate([digits, digits[:, : length // 2][:, ::-1]], axis=1)
+    xs = mirrored @ 10 ** np.arange(length, dtype=np.int64)[::-1]
+    return np.sort(xs[xs % 2 == 1])
+
+
+def product_of_digits(target: int) -> Callable[[int], np.ndarray]:
+    return lambda length: np.asarray(digit_products.numbers(length, target))
+
+
+def generator(name: str) -> Callable[[int], np.ndarray]:
+    """Returns the generator of a clue set: a series name, or product:<k> for digit products"""
+    match name.split(":"):
+        case ["squares"]:
+            return squares
+        case ["fibonacci"]:
+            return fibonacci
+        case ["primes"]:
+            return primes
+        case ["self-dividing"]:
+            return self_dividing
+        case ["odd-palindromes"]:
+            return odd_palindromes
+        case ["product", target]:
+            return product_of_digits(int(target))
+        case _:
+            raise ValueError(f"Unknown clue set: {name}")
+
+
+class Catalog:
+    """Sorted int64 members of clue sets per digit length, generated once into `.npy` files
+
+    Only zero-free members are kept. Files are memory-mapped on first use and at most
+    `max_loaded` of them are kept open, least recently used first out.
+    """
+
+    def __init__(self, root: Path | str | None = CATALOG_DIR, max_loaded: int = 32):
+        self.root = None if root is None else Path(root)
+        self.max_loaded = max_loaded
+        self._loaded: OrderedDict[tuple[str, int], np.ndarray] = OrderedDict()
+
+    def path(self, name: str, length: int) -> Path | None:
+        if self.root is None:
+            return None
+        return self.root / f"{name.replace(':', '-')}-{length}.npy"
+
+    def members(self, name: str, length: int) -> np.ndarray:
+        key = (name, length)
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return self._loaded[key]
+
+        path = self.path(name, length)
+        if path is not None and path.exists():
+            members = np.load(path, mmap_mode="r")
+        else:
+            members = generator(name)(length).astype(np.int64)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                partial = path.with_suffix(".partial.npy")
+                np.save(partial, members)
+                partial.rename(path)
+                members = np.load(path, mmap_mode="r")
+
+        self._loaded[key] = members
+        if len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+        return members
+
+    def __contains__(self, item: tuple[str, int]) -> bool:
+        """Tests whether (name, x) is a member by bisecting the file for x's digit length"""
+        name, x = item
+        members = self.members(name, len(str(x)))
+        i = int(np.searchsorted(members, x))
+        return i < len(members) and int(members[i]) == x
+
+    def digit_words(self, name: str, length: int) -> list[tuple[int, ...]]:
+        """Returns the members of one length as digit tuples, most significant first"""
+        powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+        return list(
+            map(tuple, (self.members(name, length)[:, None] // powers % 10).tolist())
+        )
+
+
+CATALOG = Catalog()
+
+
+def test_catalog(tmp_path):
+    from math import prod
+
+    def brute(length: int, accept: Callable[[int], bool]) -> list[int]:
+        return [
+            x
+            for x in range(10 ** (length - 1), 10**length)
+            if "0" not in str(x) and accept(x)
+        ]
+
+    def is_square(x):
+        return isqrt(x) ** 2 == x
+
+    def is_prime(x):
+        return x > 1 and all(x % d for d in range(2, isqrt(x) + 1))
+
+    catalog = Catalog(tmp_path, max_loaded=2)
+    for length in range(1, 5):
+        expected = {
+            "squares": brute(length, is_square),
+            "fibonacci": brute(length, lambda x: x in series.fibonacci(10**length)),
+            "primes": brute(length, is_prime),
+            "self-dividing": brute(
+                length, lambda x: all(x % int(d) == 0 for d in str(x))
+            ),
+            "odd-palindromes": brute(
+                length, lambda x: x % 2 == 1 and str(x) == str(x)[::-1]
+            ),
+            "product:20": brute(length, lambda x: prod(map(int, str(x))) == 20),
+        }
+        for name, members in expected.items():
+            assert catalog.members(name, length).tolist() == members
+            assert len(catalog._loaded) <= 2
+
+    # Reloaded from disk as memory maps
+    reloaded = Catalog(tmp_path)
+    assert isinstance(reloaded.members("squares", 4), np.memmap)
+    assert ("squares", 1764) in reloaded and ("squares", 1765) not in reloaded
+    assert reloaded.digit_words("product:20", 2) == [(4, 5), (5, 4)]
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Generate clue set catalog files")
+    parser.add_argument("name", help="squares, fibonacci, primes, self-dividing, ...")
+    parser.add_argument("lengths", type=int, nargs="+")
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        print(args.name, length, len(CATALOG.members(args.name, length)))
@@ -0,0 +1,231 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from math import gcd
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+from utils.catalog import CATALOG, all_zero_free
+from utils.lib import digit_dp
+from utils.prime_index import PrimeIndex
+from utils.series import SIEVE
+from utils.tiling import Tiling
+
+# Unlisted clue sets are enumerated over zero-free numbers up to this length
+ENUMERATE_MAX = 5
+
+
+@lru_cache(maxsize=1)
+def enumerated_primes() -> PrimeIndex:
+    """Indexes the primes of up to ENUMERATE_MAX digits from the sieve, for vectorized tests"""
+    limit = 10**ENUMERATE_MAX
+    chunks = [np.empty(0, dtype=np.int64), *SIEVE.between(2, limit)]
+    return PrimeIndex(np.concatenate(chunks).astype("<u8"), limit)
+
+
+@dataclass(frozen=True)
+class ClueSet:
+    """What is cheaply known about the numbers of one length that satisfy a clue"""
+
+    # Every (zero-free) member, if the catalog lists them
+    members: np.ndarray | None = None
+    modulus: int = 1  # every member is congruent to residue modulo modulus
+    residue: int = 0
+    test: Callable[[np.ndarray], np.ndarray] | None = None  # vectorized membership
+
+    def filter(self, xs: np.ndarray) -> np.ndarray:
+        """Keeps the numbers of xs that belong to the set"""
+        xs = xs[xs % self.modulus == self.residue]
+        if self.members is not None:
+            xs = xs[np.isin(xs, self.members)]
+        if self.test is not None:
+            xs = xs[self.test(xs)]
+        return xs
+
+
+@lru_cache(maxsize=None)
+def clue_set(spec: str, length: int) -> ClueSet:
+    """Describes the numbers of `length` digits satisfying a clue spec (see puzzle.clue)"""
+    match spec.split(":"):
+        case ["square"]:
+            return ClueSet(CATALOG.members("squares", length))
+        case ["fibonacci"]:
+            return ClueSet(CATALOG.members("fibonacci", length))
+        case ["prime"]:
+            return ClueSet(test=enumerated_primes().members)
+        case ["product", target]:
+            return ClueSet(CATALOG.members(f"product:{target}", length))
+        case ["div", divisor]:
+            return ClueSet(modulus=int(divisor))
+        case ["rem", divisor, remainder]:
+            return ClueSet(modulus=int(divisor), residue=int(remainder))
+        case ["odd"]:
+            return ClueSet(modulus=2, residue=1)
+        case ["self-dividing"]:
+            return ClueSet(test=digit_dp.is_self_dividing_v)
+        case ["odd-palindrome"]:
+            return ClueSet(CATALOG.members("odd-palindromes", length), 2, 1)
+        case _:
+            raise ValueError(f"Unknown clue: {spec}")
+
+
+def may_share(a: ClueSet, b: ClueSet) -> bool:
+    """Returns False only if no number can belong to both sets
+
+    Listed members are filtered by the other set. Two unlisted sets are compared by their
+    congruences alone, which is exact by the Chinese remainder theorem up to the length bounds.
+    """
+    if a.members is None and b.members is None:
+        return (a.residue - b.residue) % gcd(a.modulus, b.modulus) == 0
+    if a.members is None:
+        a, b = b, a
+    return len(b.filter(np.asarray(a.members))) > 0
+
+
+def disjoint_rows(
+    clues: Sequence[str], lengths: Iterable[int]
+) -> set[tuple[int, int, int]]:
+    """Returns the (length, i1, i2) with i1 < i2 for which rows i1 and i2 can never hold the
+    same number of that length"""
+    return {
+        (length, i1, i2)
+        for length in sorted(set(lengths))
+        for i1, i2 in combinations(range(len(clues)), 2)
+        if not may_share(clue_set(clues[i1], length), clue_set(clues[i2], length))
+    }
+
+
+@lru_cache(maxsize=None)
+def span_digits(spec: str, length: int) -> tuple[frozenset[int], ...]:
+    """Returns the digits each position of a `length`-digit clue number can take, all empty if
+    there is no such number
+
+    Listed and short sets are read off their members. Longer unlisted sets only restrict the
+    last digit, which fixes the residue modulo gcd(modulus, 10).
+    """
+    clues = clue_set(spec, length)
+    members = clues.members
+    if members is None and length <= ENUMERATE_MAX:
+        members = clues.filter(all_zero_free(length))
+    if members is None:
+        step = gcd(clues.modulus, 10)
+        last = frozenset(d for d in range(1, 10) if (d - clues.residue) % step == 0)
+        return (frozenset(range(1, 10)),) * (length - 1) + (last,)
+
+    powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+    columns = np.asarray(members)[:, None] // powers % 10
+    return tuple(frozenset(np.unique(columns[:, k]).tolist()) for k in range(length))
+
+
+@dataclass
+class RowDomain:
+    """The tilings and cell values of one row that survive its clue and highlights"""
+
+    tilings: list[int]  # indices into the row's list of tilings
+    digits: list[list[int]]  # sorted values per cell, 0 for a tiled cell
+
+
+def row_domain(spec: str, tilings: list[Tiling], highlights: list[bool]) -> RowDomain:
+    """Keeps the tilings whose every group can hold a clue number and that leave highlighted
+    cells (which have no flows, so cannot be tiled) untiled, and the cell values they allow"""
+    kept = [
+        t
+        for t, tiling in enumerate(tilings)
+        if not any(x and h for x, h in zip(tiling.tiled, highlights))
+        and all(all(span_digits(spec, len(g.cells))) for g in tiling.groups)
+    ]
+    digits: list[set[int]] = [set() for _ in highlights]
+    for t in kept:
+        for j, x in enumerate(tilings[t].tiled):
+            if x:
+                digits[j].add(0)
+        for group in tilings[t].groups:
+            for j, ds in zip(group.cells, span_digits(spec, len(group.cells))):
+                digits[j] |= ds
+    return RowDomain(kept, [sorted(ds) for ds in digits])
+
+
+def sharing_cliques(
+    rows: int, length: int, disjoint: set[tuple[int, int, int]]
+) -> list[list[int]]:
+    """Returns the maximal cliques of rows that may pairwise share a number of one length
+
+    Every pair of rows that may share a number lies in some clique, so one AllDifferent per
+    clique enforces exactly the uniqueness that `disjoint` leaves (Bron-Kerbosch with pivoting).
+    """
+    neighbours = [
+        {
+            i2
+            for i2 in range(rows)
+            if i2 != i1 and (length, *sorted((i1, i2))) not in disjoint
+        }
+        for i1 in range(rows)
+    ]
+    cliques: list[list[int]] = []
+
+    def expand(clique: set[int], candidates: set[int], excluded: set[int]) -> None:
+        if not candidates and not excluded:
+            cliques.append(sorted(clique))
+            return
+        pivot = max(
+            candidates | excluded, key=lambda i: len(neighbours[i] & candidates)
+        )
+        for i in sorted(candidates - neighbours[pivot]):
+            expand(clique | {i}, candidates & neighbours[i], excluded & neighbours[i])
+            candidates = candidates - {i}
+            excluded = excluded | {i}
+
+    expand(set(), set(range(rows)), set())
+    return sorted(cliques)
+
+
+def test_may_share():
+    from math import isqrt, prod
+
+    def brute(spec: str, length: int) -> set[int]:
+        name, *args = spec.split(":")
+        accepts = {
+            "square": lambda x: isqrt(x) ** 2 == x,
+            "prime": lambda x: x > 1 and all(x % d for d in range(2, isqrt(x) + 1)),
+            "product": lambda x: prod(map(int, str(x))) == int(args[0]),
+            "div": lambda x: x % int(args[0]) == 0,
+            "rem": lambda x: x % int(args[0]) == int(args[1]),
+            "odd": lambda x: x % 2 == 1,
+            "self-dividing": lambda x: all(x % int(d) == 0 for d in str(x)),
+            "odd-palindrome": lambda x: x % 2 and str(x) == str(x)[::-1],
+        }[name]
+        return {
+            x
+            for x in range(10 ** (length - 1), 10**length)
+            if "0" not in str(x) and accepts(x)
+        }
+
+    specs = ["square", "prime", "product:20", "div:32", "rem:2:1", "odd"]
+    specs += ["self-dividing", "odd-palindrome", "div:13"]
+    for length in range(2, 5):
+        for a, b in combinations(specs, 2):
+            if not may_share(clue_set(a, length), clue_set(b, length)):
+                assert not brute(a, length) & brute(b, length), (a, b, length)
+
+    assert not may_share(clue_set("odd-palindrome", 11), clue_set("div:32", 11))
+    assert not may_share(clue_set("rem:2:1", 11), clue_set("div:32", 11))
+    assert may_share(clue_set("div:13", 11), clue_set("div:32", 11))
+    assert span_digits("product:20", 2) == (frozenset({4, 5}), frozenset({4, 5}))
+    assert not any(span_digits("div:2025", 3))
+    assert span_digits("div:32", 9)[-1] == {2, 4, 6, 8}
+    assert span_digits("rem:2:1", 4) == (frozenset(range(1, 10)),) * 3 + (
+        frozenset({1, 3, 5, 7, 9}),
+    )
+
+    from utils.tiling import tilings
+
+    # Two 2-digit groups cannot multiply to 2025 and cell 4 is highlighted
+    domain = row_domain("product:2025", tilings(5), [False] * 4 + [True])
+    assert domain.tilings == [0, 1]
+    assert domain.digits == [[0, 1, 3, 5, 9]] + [[1, 3, 5, 9]] * 4
+    assert sharing_cliques(3, 3, {(3, 0, 1)}) == [[0, 2], [1, 2]]
+    assert sharing_cliques(3, 4, {(3, 0, 1)}) == [[0, 1, 2]]
+    assert disjoint_rows(["div:32", "odd", "div:13"], [3, 4, 3]) == {
+        (3, 0, 1),
+        (4, 0, 1),
+    }
@@ -0,0 +1,144 @@
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+import numpy as np
+
+type Exponents = tuple[int, int, int, int]  # powers of 2, 3, 5 and 7
+
+PRIMES = (2, 3, 5, 7)
+
+# Exponent vector of every non-zero digit
+DIGITS: dict[int, Exponents] = {
+    1: (0, 0, 0, 0),
+    2: (1, 0, 0, 0),
+    3: (0, 1, 0, 0),
+    4: (2, 0, 0, 0),
+    5: (0, 0, 1, 0),
+    6: (1, 1, 0, 0),
+    7: (0, 0, 0, 1),
+    8: (3, 0, 0, 0),
+    9: (0, 2, 0, 0),
+}
+
+
+def exponents(target: int) -> Exponents | None:
+    """Factorizes target over 2, 3, 5 and 7, or returns None if no digits multiply to it"""
+    if target < 1:
+        return None
+    powers = []
+    for p in PRIMES:
+        k = 0
+        while target % p == 0:
+            target //= p
+            k += 1
+        powers.append(k)
+    return (powers[0], powers[1], powers[2], powers[3]) if target == 1 else None
+
+
+def digit_exponents(digits: Iterable[int]) -> Exponents | None:
+    """Sums the exponent vectors of some digits, or returns None if any of them is zero"""
+    total = [0, 0, 0, 0]
+    for d in digits:
+        if d not in DIGITS:
+            return None
+        total = [a + b for a, b in zip(total, DIGITS[d])]
+    return (total[0], total[1], total[2], total[3])
+
+
+def _remove(rest: Exponents, d: int) -> Exponents | None:
+    left = tuple(a - b for a, b in zip(rest, DIGITS[d]))
+    return None if min(left) < 0 else left  # type: ignore
+
+
+@lru_cache(maxsize=None)
+def _count(length: int, rest: Exponents) -> int:
+    if length == 0:
+        return int(not any(rest))
+    return sum(
+        _count(length - 1, left)
+        for d in DIGITS
+        if (left := _remove(rest, d)) is not None
+    )
+
+
+@lru_cache(maxsize=None)
+def _table(length: int, rest: Exponents) -> np.ndarray:
+    if length == 0:
+        return np.zeros((int(not any(rest)), 0), dtype=np.uint8)
+    blocks = [
+        np.column_stack([np.full(len(tail), d, dtype=np.uint8), tail])
+        for d in DIGITS
+        if (left := _remove(rest, d)) is not None
+        and len(tail := _table(length - 1, left))
+    ]
+    if not blocks:
+        return np.zeros((0, length), dtype=np.uint8)
+    return np.concatenate(blocks)
+
+
+def count(length: int, target: int) -> int:
+    """Counts the ordered tuples of `length` non-zero digits whose product is target"""
+    rest = exponents(target)
+    return 0 if rest is None else _count(length, rest)
+
+
+def assignments(length: int, target: int) -> Iterator[tuple[int, ...]]:
+    """Lazily yields the tuples counted by `count` in lexicographic order"""
+
+    def walk(length: int, rest: Exponents) -> Iterator[tuple[int, ...]]:
+        if length == 0:
+            yield ()
+            return
+        for d in DIGITS:
+            left = _remove(rest, d)
+            if left is not None and _count(length - 1, left):
+                for tail in walk(length - 1, left):
+                    yield (d, *tail)
+
+    rest = exponents(target)
+    if rest is not None and _count(length, rest):
+        yield from walk(length, rest)
+
+
+def table(length: int, target: int) -> np.ndarray:
+    """Returns the tuples counted by `count` as a read-only (count, length) uint8 array
+
+    Sub-tables are memoized on (length, remaining exponents), so they are computed once and reused
+    by every length and target that reaches them.
+    """
+    rest = exponents(target)
+    if rest is None:
+        return np.zeros((0, length), dtype=np.uint8)
+    result = _table(length, rest)
+    result.flags.writeable = False
+    return result
+
+
+@lru_cache(maxsize=None)
+def numbers(length: int, target: int) -> np.ndarray:
+    """Returns the sorted int64 numbers of `length` digits whose digit product is target"""
+    powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+    result = np.sort(table(length, target).astype(np.int64) @ powers)
+    result.flags.writeable = False
+    return result
+
+
+def test_digit_products():
+    from itertools import product
+    from math import prod
+
+    for length in range(1, 5):
+        for target in [1, 5, 20, 25, 36, 2025, 11, 0]:
+            expected = [
+                ds for ds in product(range(1, 10), repeat=length) if prod(ds) == target
+            ]
+            assert count(length, target) == len(expected)
+            assert list(assignments(length, target)) == expected
+            assert sorted(map(tuple, table(length, target).tolist())) == expected
+            assert numbers(length, target).tolist() == sorted(
+                int("".join(map(str, ds))) for ds in expected
+            )
+
+    assert count(11, 2025) == len(list(assignments(11, 2025))) == 22770
+    assert digit_exponents([4, 5, 1]) == exponents(20)
+    assert digit_exponents([4, 0, 5]) is None
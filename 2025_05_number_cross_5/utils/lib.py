@@ -0,0 +1,16 @@
+"""The repository's shared modules from lib/, importable with or without lib/ on PYTHONPATH
+
+The nix shell puts lib/ on PYTHONPATH, but scripts here are also run directly, so modules of
+this puzzle import lib/ modules from here at runtime rather than by their top-level names.
+"""
+
+import sys
+from pathlib import Path
+
+# Appended after PYTHONPATH, so an existing lib/ entry still wins
+sys.path.append(str(Path(__file__).resolve().parents[2] / "lib"))
+
+import digit_dp
+import solution_sink
+
+__all__ = ["digit_dp", "solution_sink"]
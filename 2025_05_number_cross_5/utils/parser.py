@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from string import digits
 
 type Grid = list[list[int | None]]
@@ -10,6 +10,7 @@ type Grid = list[list[int | None]]
 class Puzzle:
     regions: Grid
     highlights: Grid
+    clues: list[str] = field(default_factory=list)  # optional clue spec per row
 
     @property
     def nrow(self):
@@ -21,19 +22,24 @@ class Puzzle:
 
 
 def parse_puzzle(text: str) -> Puzzle:
-    regions_text, highlights_text = text.split("\n\n")
+    regions_text, highlights_text, *clues_text = text.strip().split("\n\n")
     regions = parse_grid(regions_text)
     highlights = parse_grid(highlights_text)
-    return Puzzle(regions, highlights)
+    clues = parse_clues(clues_text[0]) if clues_text else []
+    return Puzzle(regions, highlights, clues)
 
 
 def parse_grid(text: str) -> Grid:
     return [
         [int(x) if x in digits else None for x in row.split()]
-        for row in text.split("\n")
+        for row in text.strip().split("\n")
     ]
 
 
+def parse_clues(text: str) -> list[str]:
+    return [row.strip() for row in text.strip().split("\n")]
+
+
 def test_parse_puzzle():
     expected_regions = [
         [0, 0, 0, 0, 0],
@@ -77,6 +83,15 @@ def test_parse_puzzle():
         for j in range(5)
     )
 
+    assert len(puzzle.regions) == 5
+    assert puzzle.clues == []
+
+
+def test_parse_puzzle_clues():
+    puzzle = parse_puzzle("1 1\n2 2\n\n0 .\n. .\n\nsquare\nproduct:20\n")
+    assert puzzle.clues == ["square", "product:20"]
+    assert puzzle.highlights == [[0, None], [None, None]]
+
 
 if __name__ == "__main__":
     print(parse_puzzle(open(0).read()))
@@ -0,0 +1,135 @@
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from utils.series import SIEVE, PrimeSieve
+
+HEADER = struct.Struct("<8sQ")  # magic, exclusive upper bound covered by the index
+MAGIC = b"PRIMEIDX"
+
+# Miller-Rabin with these bases is deterministic for every n < 3.3 * 10**24
+BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+
+def miller_rabin(n: int) -> bool:
+    if n < 2:
+        return False
+    for p in BASES:
+        if n % p == 0:
+            return n == p
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+
+    for a in BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+@dataclass
+class PrimeIndex:
+    """Every prime below `limit` as a sorted uint64 array, usually memory-mapped from disk
+
+    Membership bisects the array below the limit and falls back to Miller-Rabin above it.
+    """
+
+    primes: np.ndarray
+    limit: int
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PrimeIndex":
+        """Memory-maps an index written by `build`, or returns an empty index if there is none"""
+        path = Path(path)
+        if not path.exists():
+            return cls(np.empty(0, dtype="<u8"), 0)
+
+        with open(path, "rb") as f:
+            magic, limit = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a prime index")
+
+        if path.stat().st_size == HEADER.size:
+            return cls(np.empty(0, dtype="<u8"), limit)
+        primes = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size)
+        return cls(primes, limit)
+
+    def __contains__(self, n: int) -> bool:
+        if n >= self.limit:
+            return miller_rabin(n)
+        i = int(np.searchsorted(self.primes, n))
+        return i < len(self.primes) and int(self.primes[i]) == n
+
+    def members(self, xs: np.ndarray) -> np.ndarray:
+        """Vectorized membership for an array of non-negative integers"""
+        xs = np.asarray(xs, dtype=np.int64)
+        result = np.zeros(len(xs), dtype=bool)
+        below = xs < self.limit
+        if len(self.primes):
+            i = np.searchsorted(self.primes, xs[below].astype("<u8"))
+            i = np.minimum(i, len(self.primes) - 1)
+            result[below] = self.primes[i] == xs[below].astype("<u8")
+        result[~below] = [miller_rabin(int(x)) for x in xs[~below]]
+        return result
+
+
+def build(path: str | Path, limit: int, sieve: PrimeSieve = SIEVE) -> int:
+    """Writes an index of the primes below limit, returning how many there are"""
+    count = 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, limit))
+        for chunk in sieve.between(2, limit):
+            f.write(chunk.astype("<u8").tobytes())
+            count += len(chunk)
+    return count
+
+
+def test_miller_rabin():
+    sieve = PrimeSieve(None, size=1024)
+    primes = set(np.concatenate(list(sieve.between(2, 10_000))).tolist())
+    assert all(miller_rabin(n) == (n in primes) for n in range(10_000))
+
+    assert miller_rabin(2**61 - 1)
+    assert miller_rabin(99_999_999_977)
+    assert not miller_rabin(3_215_031_751)  # strong pseudoprime to bases 2, 3, 5 and 7
+    assert not miller_rabin(561)  # Carmichael number
+    assert not miller_rabin((2**31 - 1) * (2**61 - 1))
+
+
+def test_prime_index(tmp_path):
+    path = tmp_path / "primes.idx"
+    assert build(path, 100_000, PrimeSieve(None, size=1024)) == 9592
+
+    index = PrimeIndex.load(path)
+    assert index.limit == 100_000
+    assert [n for n in range(30) if n in index] == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert 99_991 in index and 99_993 not in index
+    assert 100_003 in index and 100_005 not in index  # beyond the index
+
+    assert 13 in PrimeIndex.load(tmp_path / "missing.idx")
+
+    xs = np.array([0, 1, 2, 9, 97, 99_991, 99_993, 100_003, 100_005])
+    assert index.members(xs).tolist() == [n in index for n in xs.tolist()]
+    assert PrimeIndex.load(tmp_path / "missing.idx").members(xs).tolist() == [
+        n in index for n in xs.tolist()
+    ]
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Generate a memory-mappable index of primes")
+    parser.add_argument("path")
+    parser.add_argument("-l", "--limit", type=int, default=10**8)
+    args = parser.parse_args()
+
+    print(build(args.path, args.limit), "primes below", args.limit)
@@ -1,7 +1,17 @@
+from collections import defaultdict
+from dataclasses import dataclass
 from functools import lru_cache
+from math import isqrt
+from os import getpid
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+import numpy as np
+from utils.automata import Automaton
 
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "primes"
 
-@lru_cache
+
+@lru_cache(maxsize=8)
 def fibonacci(limit: int):
     def f(n: int):
         prev = 0
@@ -13,7 +23,7 @@ def fibonacci(limit: int):
     return list(f(limit))
 
 
-@lru_cache
+@lru_cache(maxsize=8)
 def powerset(n: int):
     def f(n: int):
         if n == 0:
@@ -26,27 +36,219 @@ def powerset(n: int):
     return list(f(n))
 
 
-@lru_cache
-def primes(limit: int):
-    def f(n: int):
-        factors = {}
-        for q in range(2, n):
-            if q not in factors:
-                factors[q * q] = [q]
-                yield q
-            else:
-                for p in factors[q]:
-                    factors.setdefault(p + q, []).append(p)
-                del factors[q]
+@lru_cache(maxsize=8)
+def small_primes(limit: int) -> np.ndarray:
+    """Returns the odd primes up to and including limit with a plain NumPy sieve"""
+    is_prime = np.ones(limit + 1, dtype=bool)
+    is_prime[:2] = False
+    for i in range(2, isqrt(limit) + 1):
+        if is_prime[i]:
+            is_prime[i * i :: i] = False
+    return np.flatnonzero(is_prime)[1:]
 
-    return list(f(limit))
 
+@dataclass(frozen=True)
+class PrimeSieve:
+    """A segmented sieve over odd numbers, persisting each completed segment to disk
 
-@lru_cache
-def squares(limit: int):
-    def f(n: int):
-        ub = int(n**0.5)
-        for i in range(1, ub + 1):
-            yield i * i
+    Segment k covers [k * size, (k + 1) * size) and is stored as a packed bitset in which bit i
+    marks whether k * size + 2i + 1 is prime.
+    """
 
-    return list(f(limit))
+    cache_dir: Path | str | None = CACHE_DIR
+    size: int = 1 << 24
+
+    def segment(self, k: int) -> np.ndarray:
+        """Returns the unpacked odd-only primality bits of segment k"""
+        path = Path(self.cache_dir, f"{self.size}-{k}.npy") if self.cache_dir else None
+        if path is not None and path.exists():
+            return np.unpackbits(np.load(path), count=self.size // 2).view(bool)
+
+        lo, hi = k * self.size, (k + 1) * self.size
+        odd = np.ones(self.size // 2, dtype=bool)  # odd[i] is lo + 2i + 1
+        if k == 0:
+            odd[0] = False  # 1
+        for p in map(int, small_primes(1 << isqrt(hi).bit_length())):
+            if p * p >= hi:
+                break
+            start = max(p * p, (lo + p - 1) // p * p)
+            if start % 2 == 0:
+                start += p
+            odd[(start - lo) // 2 :: p] = False
+
+        if path is not None:
+            # Written aside and renamed so concurrent readers never see a partial segment
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_suffix(f".{getpid()}.npy")
+            np.save(partial, np.packbits(odd))
+            partial.rename(path)
+        return odd
+
+    def between(self, lo: int, hi: int) -> Iterator[np.ndarray]:
+        """Yields the primes in [lo, hi) in ascending int64 chunks, one per segment"""
+        if lo <= 2 < hi:
+            yield np.array([2], dtype=np.int64)
+        for k in range(lo // self.size, -(-hi // self.size)):
+            base = k * self.size
+            found = base + 1 + 2 * np.flatnonzero(self.segment(k)).astype(np.int64)
+            yield found[(found >= lo) & (found < hi)]
+
+    def count(self, lo: int, hi: int) -> int:
+        """Counts the primes in [lo, hi) without materializing them"""
+        total = int(lo <= 2 < hi)
+        for k in range(lo // self.size, -(-hi // self.size)):
+            base = k * self.size
+            # First i with base + 2i + 1 >= lo
+            start = max(0, (lo - base) // 2)
+            # First i with base + 2i + 1 >= hi
+            stop = min(self.size // 2, (hi - base) // 2)
+            total += int(np.count_nonzero(self.segment(k)[start:stop]))
+        return total
+
+    def count_by_length(self, length: int) -> int:
+        """Counts the primes with exactly `length` digits"""
+        return self.count(10 ** (length - 1), 10**length)
+
+
+SIEVE = PrimeSieve()
+
+
+@lru_cache(maxsize=8)
+def as_digits(number: int) -> tuple[int, ...]:
+    return tuple(int(d) for d in str(number))
+
+
+@lru_cache(maxsize=16)
+def digit_words(name: str, length: int) -> list[tuple[int, ...]]:
+    """Returns the digits of all members of a catalogued series (e.g. "squares") with exactly
+    `length` digits, none of them zero
+
+    Untiled cells never hold a zero, so members containing one can never be placed in the grid.
+    Members are read from the clue catalog rather than from the series list itself.
+    """
+    # The catalog generates its files from this module
+    from utils.catalog import CATALOG
+
+    return CATALOG.digit_words(name, length)
+
+
+@dataclass(frozen=True)
+class DigitTrie:
+    """A set of equal-length digit words as a minimized DFA, with completion counts per state
+
+    Fixed-length words make minimization a single bottom-up pass: prefixes of the same length
+    share a state iff they have the same set of (digit, suffix state) continuations.
+    """
+
+    length: int
+    automaton: Automaton
+    counts: dict[int, int]  # accepted completions from each state
+
+    @classmethod
+    def build(cls, words: Iterable[Sequence[int]], length: int) -> "DigitTrie":
+        final = 0
+        counts = {final: 1}
+        transitions = []
+        registry: dict[tuple[tuple[int, int], ...], int] = {}
+
+        states = {tuple(word): final for word in words}
+        for _ in range(length):
+            edges = defaultdict(list)
+            for word, state in states.items():
+                edges[word[:-1]].append((word[-1], state))
+
+            parents = {}
+            for prefix, edges_ in edges.items():
+                signature = tuple(sorted(edges_))
+                if signature not in registry:
+                    registry[signature] = state = len(counts)
+                    counts[state] = sum(counts[head] for _, head in signature)
+                    transitions.extend((state, d, head) for d, head in signature)
+                parents[prefix] = registry[signature]
+            states = parents
+
+        if () not in states:  # no words: a lone start state that accepts nothing
+            return cls(length, Automaton(start=1, finals=[], transitions=[]), {1: 0})
+
+        return cls(
+            length=length,
+            automaton=Automaton(
+                start=states[()], finals=[final], transitions=transitions
+            ),
+            counts=counts,
+        )
+
+    def __len__(self) -> int:
+        return self.counts[self.automaton.start]
+
+    def count_prefix(self, prefix: Sequence[int]) -> int:
+        """Counts the words starting with the given digits"""
+        state = self.automaton.run(prefix)
+        return 0 if state is None else self.counts[state]
+
+
+@lru_cache(maxsize=64)
+def digit_trie(name: str, length: int) -> DigitTrie:
+    """Returns the zero-free members of a catalogued series with exactly `length` digits as a
+    minimized DFA"""
+    return DigitTrie.build(digit_words(name, length), length)
+
+
+def test_digit_trie():
+    from itertools import product
+
+    for name, length in [
+        ("squares", 4),
+        ("fibonacci", 3),
+        ("primes", 3),
+        ("squares", 11),
+    ]:
+        words = set(digit_words(name, length))
+        trie = digit_trie(name, length)
+        assert len(trie) == len(words)
+        assert trie.automaton.states <= 1 + sum(
+            len({w[:k] for w in words}) for k in range(length)
+        )
+        if length <= 4:
+            for word in product(range(1, 10), repeat=length):
+                assert trie.automaton.accepts(word) == (word in words)
+        assert trie.count_prefix((4, 7)) == sum(w[:2] == (4, 7) for w in words)
+
+    empty = DigitTrie.build([], 3)
+    assert len(empty) == 0 and not empty.automaton.accepts((1, 2, 3))
+
+
+def test_prime_sieve(tmp_path):
+    sieve = PrimeSieve(tmp_path, size=64)
+    expected = [n for n in range(2, 1000) if all(n % d for d in range(2, isqrt(n) + 1))]
+
+    assert np.concatenate(list(sieve.between(2, 1000))).tolist() == expected
+    assert np.concatenate(list(sieve.between(100, 200))).tolist() == [
+        n for n in expected if 100 <= n < 200
+    ]
+    assert [sieve.count_by_length(n) for n in range(1, 4)] == [4, 21, 143]
+    assert all(
+        sieve.count(lo, hi) == sum(lo <= n < hi for n in expected)
+        for lo in range(0, 200, 7)
+        for hi in range(lo, 300, 13)
+    )
+
+    # Segments are read back from disk on later runs
+    assert len(list(tmp_path.glob("*.npy"))) == 16
+    cached = PrimeSieve(tmp_path, size=64)
+    assert np.concatenate(list(cached.between(2, 1000))).tolist() == expected
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        description="Count the members of a series with a digit prefix"
+    )
+    parser.add_argument("series", choices=["fibonacci", "primes", "squares"])
+    parser.add_argument("length", type=int)
+    parser.add_argument("prefix", nargs="?", default="")
+    args = parser.parse_args()
+
+    trie = digit_trie(args.series, args.length)
+    print(trie.count_prefix([int(d) for d in args.prefix]))
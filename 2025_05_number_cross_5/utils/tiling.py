@@ -1,49 +1,101 @@
 #!/usr/bin/env python
 
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from typing import Iterator
 
 
-@dataclass
-class Tiling:
-    tiled: list[bool]  # boolean mask indicating tiled indices
-    groups: list["Group"]  # list of untiled groups
-
-
 @dataclass
 class Group:
     cells: list[int]  # indices of cells in the group
     edges: list[int]  # indices of elements bordering the group
 
 
-# NOTE: Vibe-coded at: https://chatgpt.com/c/6828a75c-1368-8012-a34a-9b15f3b0898b
+@dataclass(frozen=True)
+class Tiling:
+    """A valid tiling of n cells as a bitmask of tiled cells (bit i is cell i) and the
+    [start, end) bounds of its untiled runs, with `tiled` and `groups` built on first access"""
+
+    n: int
+    mask: int
+    runs: tuple[tuple[int, int], ...]
+
+    @cached_property
+    def tiled(self) -> list[bool]:
+        """Boolean mask indicating tiled indices"""
+        return [(self.mask >> i) & 1 == 1 for i in range(self.n)]
+
+    @cached_property
+    def groups(self) -> list[Group]:
+        """List of untiled groups"""
+        return [
+            Group(
+                list(range(start, end)),
+                ([start - 1] if start > 0 else []) + ([end] if end < self.n else []),
+            )
+            for start, end in self.runs
+        ]
+
+
+# Scanning a row, a tiling is a word accepted by this DFA over {untiled, tiled}: tiles are at
+# least 3 apart and every untiled run, including those at the edges, has at least 2 cells
+EDGE, TILE, RUN1, RUN2 = range(4)
+STEP = {
+    EDGE: (RUN1, TILE),
+    TILE: (RUN1, None),
+    RUN1: (RUN2, None),
+    RUN2: (RUN2, TILE),
+}
+ACCEPT = {EDGE, TILE, RUN2}
+
+
+@lru_cache(maxsize=None)
+def _completions(k: int, state: int) -> int:
+    """Counts the ways to finish a row with k more cells from a DFA state"""
+    if k == 0:
+        return int(state in ACCEPT)
+    return sum(_completions(k - 1, s) for s in STEP[state] if s is not None)
+
+
+def count_tilings(n: int) -> int:
+    """Counts the valid tilings of n cells without enumerating them"""
+    return _completions(n, EDGE)
+
+
+def _runs(n: int, mask: int) -> tuple[tuple[int, int], ...]:
+    bounds = [-1, *(i for i in range(n) if (mask >> i) & 1), n]
+    return tuple((a + 1, b) for a, b in zip(bounds, bounds[1:]) if b - a > 1)
+
+
 def get_tilings(n: int) -> Iterator[Tiling]:
-    for bits in range(1 << n):
-        tile_mask = [(bits >> i) & 1 == 1 for i in range(n)]
-        tiles = {i for i, v in enumerate(tile_mask) if v}
-        if any((i + 1 in tiles or i + 2 in tiles) for i in tiles):
-            continue  # tiles too close
-
-        groups = []
-        i = 0
-        while i < n:
-            if tile_mask[i]:
-                i += 1
-                continue
-            j = i
-            while j < n and not tile_mask[j]:
-                j += 1
-            if j - i < 2:
-                break  # invalid group
-            edges = []
-            if i > 0 and tile_mask[i - 1]:
-                edges.append(i - 1)
-            if j < n and tile_mask[j]:
-                edges.append(j)
-            groups.append(Group(list(range(i, j)), edges))
-            i = j
-        else:
-            yield Tiling(tile_mask, groups)
+    """Yields the valid tilings of n cells in ascending bitmask order
+
+    Cells are decided from the highest bit down, untiled first, and only into DFA states that can
+    still be completed, so every branch of the walk ends in a tiling.
+    """
+
+    def walk(i: int, state: int, mask: int) -> Iterator[int]:
+        if i < 0:
+            yield mask
+            return
+        for bit, nxt in enumerate(STEP[state]):
+            if nxt is not None and _completions(i, nxt):
+                yield from walk(i - 1, nxt, mask | (bit << i))
+
+    for mask in walk(n - 1, EDGE, 0):
+        yield Tiling(n, mask, _runs(n, mask))
+
+
+@lru_cache
+def tilings(n: int) -> list[Tiling]:
+    """Returns the valid tilings of n cells, enumerated once per length and shared"""
+    return list(get_tilings(n))
+
+
+@lru_cache
+def compatibility(n: int) -> list[list[bool]]:
+    """Returns whether each pair of tilings of n cells can be stacked without touching tiles"""
+    return [[not t1.mask & t2.mask for t2 in tilings(n)] for t1 in tilings(n)]
 
 
 def test_get_tilings():
@@ -52,13 +104,49 @@ def test_get_tilings():
     assert len(list(get_tilings(5))) == 5  # [.....], [x....], [....x], [..x..], [x...x]
     assert len(list(get_tilings(11))) == 54
 
+    # Brute force over every bitmask, as in the original generator
+    def brute(n: int) -> list[list[bool]]:
+        masks = [[(bits >> i) & 1 == 1 for i in range(n)] for bits in range(1 << n)]
+        words = ["".join(".x"[x] for x in mask) for mask in masks]
+        return [
+            mask
+            for mask, word in zip(masks, words)
+            if "xx" not in word and all(len(run) != 1 for run in word.split("x"))
+        ]
+
+    for n in range(13):
+        assert [t.tiled for t in get_tilings(n)] == brute(n)
+        assert count_tilings(n) == len(brute(n))
+
+    tiling = list(get_tilings(11))[-1]
+    assert tiling.mask == 0b10010010001 and tiling.runs == ((1, 4), (5, 7), (8, 10))
+    assert [g.edges for g in tiling.groups] == [[0, 4], [4, 7], [7, 10]]
+    assert count_tilings(25) == sum(1 for _ in get_tilings(25))
+
+
+def test_compatibility():
+    compatible = compatibility(5)
+    assert [[int(x) for x in row] for row in compatible] == [
+        [1, 1, 1, 1, 1],
+        [1, 0, 1, 1, 0],
+        [1, 1, 0, 1, 1],
+        [1, 1, 1, 0, 0],
+        [1, 0, 1, 0, 0],
+    ]
+    assert sum(map(sum, compatibility(11))) == 1489
+
 
 if __name__ == "__main__":
     from argparse import ArgumentParser
 
     parser = ArgumentParser(description="Generate valid tilings for a given row size")
     parser.add_argument("n", type=int)
+
+    parser.add_argument("--count", action="store_true", help="only count them")
     args = parser.parse_args()
 
-    for tiling in get_tilings(args.n):
-        print(tiling)
+    if args.count:
+        print(count_tilings(args.n))
+    else:
+        for tiling in get_tilings(args.n):
+            print(tiling)
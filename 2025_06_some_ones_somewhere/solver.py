@@ -1,6 +1,7 @@
+from contextlib import nullcontext
 from dataclasses import dataclass
 from itertools import pairwise
-from typing import Callable, Protocol
+from typing import TYPE_CHECKING, Callable, Protocol
 from ortools.sat.python.cp_model import (
     OPTIMAL,
     CpSolver,
@@ -13,6 +14,10 @@ from ortools.sat.python.cp_model import (
 
 import puzzle
 
+if TYPE_CHECKING:
+    # lib/ is only needed on PYTHONPATH when solutions are recorded
+    from solution_sink import SolutionSink
+
 
 @dataclass
 class TileModel:
@@ -27,13 +32,37 @@ class TileModel:
 type SolutionHandler = Callable[[puzzle.Grid[puzzle.Tile]], None]
 
 
+def solution_sink(
+    model: puzzle.Grid[TileModel], path: str, format="jsonl"
+) -> "SolutionSink":
+    """Records tile positions in the order of `Grid.squares`"""
+    from solution_sink import SolutionSink
+
+    tiles = [tile for tile in model.squares if tile is not None]
+    fields = {
+        "x": [tile.x_interval.StartExpr() for tile in tiles],
+        "y": [tile.y_interval.StartExpr() for tile in tiles],
+    }
+    return SolutionSink(path, fields, format)
+
+
 class SolutionCallback(CpSolverSolutionCallback):
-    def __init__(self, model: puzzle.Grid[TileModel], handler: SolutionHandler):
+    def __init__(
+        self,
+        model: puzzle.Grid[TileModel],
+        handler: SolutionHandler,
+        sink: "SolutionSink | None" = None,
+    ):
         super().__init__()
         self.model: puzzle.Grid[TileModel] = model
         self.handler: SolutionHandler = handler
+        self.sink: "SolutionSink | None" = sink
 
     def OnSolutionCallback(self) -> None:
+        if self.sink is not None:
+            self.sink.record(self)
+            return
+
         def get_tile_soln(tile: TileModel | None, size: int) -> puzzle.Tile:
             assert tile is not None
             x = self.Value(tile.x_interval.StartExpr())
@@ -44,7 +73,12 @@ class SolutionCallback(CpSolverSolutionCallback):
         self.handler(soln)
 
 
-def solve(grid: puzzle.Grid[puzzle.Tile]) -> list[puzzle.Grid[puzzle.Tile]]:
+def solve(
+    grid: puzzle.Grid[puzzle.Tile],
+    sink_path: str | None = None,
+    sink_format: str = "jsonl",
+) -> list[puzzle.Grid[puzzle.Tile]]:
+    """Returns all solutions, or records them to a file (returning none) if a sink path is given"""
     model = CpModel()
 
     def get_tile_model(tile: puzzle.Tile | None, size: int) -> TileModel:
@@ -110,8 +144,15 @@ def solve(grid: puzzle.Grid[puzzle.Tile]) -> list[puzzle.Grid[puzzle.Tile]]:
     solver.parameters.enumerate_all_solutions = True
 
     solutions: list[puzzle.Grid[puzzle.Tile]] = []
-    solution_callback = SolutionCallback(grid_model, handler=solutions.append)
-    status = solver.Solve(model, solution_callback=solution_callback)
+    with (
+        solution_sink(grid_model, sink_path, sink_format)
+        if sink_path
+        else nullcontext()
+    ) as sink:
+        solution_callback = SolutionCallback(
+            grid_model, handler=solutions.append, sink=sink
+        )
+        status = solver.Solve(model, solution_callback=solution_callback)
 
     return solutions if status == OPTIMAL else []
 
@@ -122,9 +163,15 @@ if __name__ == "__main__":
 
     parser = ArgumentParser()
     parser.add_argument("-p", "--path")
+    parser.add_argument("--sink", metavar="PATH", help="record solutions to a file")
+    parser.add_argument("--sink-format", choices=["jsonl", "binary"], default="jsonl")
     args = parser.parse_args()
 
     grid = puzzle.parse_grid(args.path)
+    if args.sink:
+        solve(grid, args.sink, args.sink_format)
+        exit()
+
     match solve(grid):
         case []:
             print("NO SOLUTIONS FOUND")
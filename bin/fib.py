@@ -1,12 +1,87 @@
 #!/usr/bin/env python
 
+from math import isqrt, log, sqrt
+
+import numpy as np
+from int_stream import write_ints
+
+PHI = (1 + sqrt(5)) / 2
+INT64_MAX = 2**63 - 1
+
+
+def fibonacci(n: int) -> int:
+    """Returns F(n) (F(0) = 0, F(1) = F(2) = 1) by fast doubling in O(log n) multiplications"""
+
+    def pair(n: int) -> tuple[int, int]:
+        if n == 0:
+            return 0, 1
+        a, b = pair(n // 2)
+        c = a * (2 * b - a)  # F(2k)
+        d = a * a + b * b  # F(2k + 1)
+        return (d, c + d) if n % 2 else (c, d)
+
+    return pair(n)[0]
+
+
+def is_fibonacci(x: int) -> bool:
+    """x is a Fibonacci number iff 5x^2 + 4 or 5x^2 - 4 is a perfect square"""
+    return x >= 0 and any(
+        (y := 5 * x * x + s) >= 0 and isqrt(y) ** 2 == y for s in (4, -4)
+    )
+
+
+def index_at_least(x: int) -> int:
+    """Returns the smallest k >= 1 with F(k) >= x, estimated from Binet's formula and corrected"""
+    if x <= 1:
+        return 1
+    k = max(1, int((log(x) + log(sqrt(5))) / log(PHI)) - 1)  # log takes big ints
+    while fibonacci(k) >= x:
+        k -= 1
+    while fibonacci(k) < x:
+        k += 1
+    return k
+
+
+def indices_between(lo: int, hi: int) -> range:
+    """Returns the k >= 1 with lo <= F(k) < hi (F(1) = F(2) = 1 both count)"""
+    return range(index_at_least(lo), index_at_least(hi) if hi > lo else 0)
+
+
+def fibonacci_between(lo: int, hi: int) -> list[int]:
+    return [fibonacci(k) for k in indices_between(lo, hi)]
+
 
 def fibonacci_before(n: int):
-    prev = 0
-    curr = 1
-    while curr < n:
-        yield curr
-        prev, curr = curr, prev + curr
+    yield from fibonacci_between(1, n)
+
+
+def test_fibonacci():
+    assert list(fibonacci_before(30)) == [1, 1, 2, 3, 5, 8, 13, 21]
+    assert fibonacci(90) == 2880067194370816120
+    assert [x for x in range(100) if is_fibonacci(x)] == [
+        0,
+        1,
+        2,
+        3,
+        5,
+        8,
+        13,
+        21,
+        34,
+        55,
+        89,
+    ]
+    assert is_fibonacci(fibonacci(300)) and not is_fibonacci(fibonacci(300) + 1)
+    assert fibonacci_between(10**10, 10**11) == [
+        12586269025,
+        20365011074,
+        32951280099,
+        53316291173,
+        86267571272,
+    ]
+    assert len(indices_between(1, 2)) == 2 and len(indices_between(4, 5)) == 0
+    k = index_at_least(10**400)  # beyond float range
+    assert fibonacci(k - 1) < 10**400 <= fibonacci(k)
 
 
 def main():
@@ -14,10 +89,22 @@ def main():
 
     parser = ArgumentParser()
     parser.add_argument("upper_bound", type=int)
+    parser.add_argument("--lo", type=int, default=1, help="inclusive lower bound")
+    parser.add_argument("--count", action="store_true", help="only count the numbers")
+    parser.add_argument("--binary", action="store_true", help="write raw int64 values")
     args = parser.parse_args()
 
-    for p in fibonacci_before(args.upper_bound):
-        print(p)
+    if args.count:
+        print(len(indices_between(args.lo, args.upper_bound)))
+    else:
+        # Text output is not limited to int64
+        if args.binary and args.upper_bound - 1 > INT64_MAX:
+            raise ValueError(
+                "binary output is int64, so the upper bound must be at most 2^63"
+            )
+        values = fibonacci_between(args.lo, args.upper_bound)
+        dtype = np.int64 if args.binary else object
+        write_ints([np.array(values, dtype=dtype)], args.binary)
 
 
 if __name__ == "__main__":
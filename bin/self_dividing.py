@@ -1,24 +1,28 @@
 #!/usr/bin/env python
 
+from digit_dp import between, count
+from int_stream import write_ints
+
 
 def self_dividing_before(n: int):
-    for i in range(n):
-        digits = set(str(i))
-        if '0' in digits:
-            continue
-        if any(i % int(d) != 0 for d in digits):
-            continue
-        yield i
+    for chunk in between(1, n):
+        yield from chunk.tolist()
+
 
 def main():
     from argparse import ArgumentParser
 
     parser = ArgumentParser()
     parser.add_argument("upper_bound", type=int)
+    parser.add_argument("--lo", type=int, default=1, help="inclusive lower bound")
+    parser.add_argument("--count", action="store_true", help="only count the numbers")
+    parser.add_argument("--binary", action="store_true", help="write raw int64 values")
     args = parser.parse_args()
 
-    for p in self_dividing_before(args.upper_bound):
-        print(p)
+    if args.count:
+        print(count(args.lo, args.upper_bound))
+    else:
+        write_ints(between(args.lo, args.upper_bound), args.binary)
 
 
 if __name__ == "__main__":
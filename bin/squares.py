@@ -1,9 +1,52 @@
 #!/usr/bin/env python
 
+from math import isqrt
+from typing import Iterator
+
+import numpy as np
+from int_stream import write_ints
+
+INT64_MAX = 2**63 - 1
+
+
+def is_square(x: int) -> bool:
+    return x >= 0 and isqrt(x) ** 2 == x
+
+
+def roots_between(lo: int, hi: int) -> range:
+    """Returns the roots of the positive squares in [lo, hi), using exact integer square roots"""
+    lo = max(lo, 1)
+    return range(isqrt(lo - 1) + 1, isqrt(hi - 1) + 1 if hi > lo else 0)
+
+
+def count_squares(lo: int, hi: int) -> int:
+    return len(roots_between(lo, hi))
+
+
+def squares_between(lo: int, hi: int, chunk: int = 1 << 20) -> Iterator[np.ndarray]:
+    """Yields the positive squares in [lo, hi) in ascending int64 chunks"""
+    if hi - 1 > INT64_MAX:
+        raise ValueError("squares are emitted as int64, so hi must be at most 2^63")
+    roots = roots_between(lo, hi)
+    for start in range(roots.start, roots.stop, chunk):
+        r = np.arange(start, min(start + chunk, roots.stop), dtype=np.int64)
+        yield r * r
+
 
 def squares_before(n: int):
-    for i in range(1, 1 + int(n**0.5)):
-        yield i * i
+    for chunk in squares_between(1, n):
+        yield from chunk.tolist()
+
+
+def test_squares():
+    assert list(squares_before(50)) == [1, 4, 9, 16, 25, 36, 49]
+    assert count_squares(10**10, 10**11) == 216_228
+    assert count_squares(16, 17) == 1 and count_squares(17, 25) == 0
+    big = (2**31 - 1) ** 2
+    assert is_square(big) and not is_square(big + 1)
+    assert np.concatenate(list(squares_between(big, big + 1, chunk=7))).tolist() == [
+        big
+    ]
 
 
 def main():
@@ -11,10 +54,15 @@ def main():
 
     parser = ArgumentParser()
     parser.add_argument("upper_bound", type=int)
+    parser.add_argument("--lo", type=int, default=1, help="inclusive lower bound")
+    parser.add_argument("--count", action="store_true", help="only count the squares")
+    parser.add_argument("--binary", action="store_true", help="write raw int64 values")
     args = parser.parse_args()
 
-    for p in squares_before(args.upper_bound):
-        print(p)
+    if args.count:
+        print(count_squares(args.lo, args.upper_bound))
+    else:
+        write_ints(squares_between(args.lo, args.upper_bound), args.binary)
 
 
 if __name__ == "__main__":
@@ -38,6 +38,9 @@
             seaborn
             venvShellHook
           ]);
+          postShellHook = ''
+            export PYTHONPATH="$PWD/lib''${PYTHONPATH:+:$PYTHONPATH}"
+          '';
         };
       });
     };
@@ -0,0 +1,41 @@
+import sys
+from typing import BinaryIO, Iterable
+
+import numpy as np
+
+
+def write_ints(
+    chunks: Iterable[np.ndarray],
+    binary: bool = False,
+    out: BinaryIO | None = None,
+) -> int:
+    """Writes integer chunks as newline-separated text or raw little-endian int64, returning
+    how many were written
+
+    Each chunk is written with a single call, so output is buffered per chunk rather than per
+    number. Binary output can be read back with np.fromfile(path, "<i8").
+    """
+    stream: BinaryIO = sys.stdout.buffer if out is None else out
+    total = 0
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if binary:
+            stream.write(np.asarray(chunk, dtype="<i8").tobytes())
+        else:
+            stream.write("\n".join(map(str, chunk.tolist())).encode() + b"\n")
+        total += len(chunk)
+    stream.flush()
+    return total
+
+
+def test_write_ints(tmp_path):
+    chunks = [np.array([1, 22, 333]), np.array([], dtype=np.int64), np.array([4444])]
+
+    with open(tmp_path / "ints.txt", "wb") as f:
+        assert write_ints(chunks, out=f) == 4
+    assert (tmp_path / "ints.txt").read_text() == "1\n22\n333\n4444\n"
+
+    with open(tmp_path / "ints.bin", "wb") as f:
+        write_ints(chunks, binary=True, out=f)
+    assert np.fromfile(tmp_path / "ints.bin", "<i8").tolist() == [1, 22, 333, 4444]
@@ -0,0 +1,153 @@
+import json
+import struct
+from array import array
+from queue import SimpleQueue
+from threading import Thread
+from typing import Any, BinaryIO, Literal, Protocol, Self, get_args
+
+type Nested = Any  # a variable/expression, or arbitrarily nested lists of them
+type Format = Literal["jsonl", "binary"]
+
+HEADER = struct.Struct("<qd")  # solution number, wall time
+
+
+class Callback(Protocol):
+    def Value(self, expression: Any, /) -> int: ...
+    def WallTime(self) -> float: ...
+
+
+class SolutionSink:
+    """Writes solutions to disk on a background thread so solver callbacks return quickly
+
+    Inside a solution callback, `record` only copies the values of the registered fields into a
+    flat int64 array and queues it. A writer thread drains the queue, emitting either one JSON
+    object per solution or fixed-size binary records (int64 solution number, float64 wall time,
+    then the int64 values of every field in registration order, see `read_binary`).
+    """
+
+    def __init__(self, path: str, fields: dict[str, Nested], format: Format = "jsonl"):
+        self.format = format
+        self.shapes = {name: _shape(value) for name, value in fields.items()}
+        self.variables = [var for value in fields.values() for var in _flatten(value)]
+        self.count = 0
+
+        self._file: BinaryIO = open(path, "wb")
+        self._queue: SimpleQueue[tuple[int, float, array] | None] = SimpleQueue()
+        self._writer = Thread(target=self._drain, daemon=True)
+        self._writer.start()
+
+    def record(self, callback: Callback) -> None:
+        """Copies the current solution out of a solver callback"""
+        self.count += 1
+        values = array("q", map(callback.Value, self.variables))
+        self._queue.put((self.count, callback.WallTime(), values))
+
+    def close(self) -> None:
+        """Waits for all recorded solutions to be written"""
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _drain(self) -> None:
+        while (item := self._queue.get()) is not None:
+            soln, wall_time, values = item
+            match self.format:
+                case "jsonl":
+                    record = {"soln": soln, "wall_time": wall_time}
+                    offset = 0
+                    for name, shape in self.shapes.items():
+                        size = _size(shape)
+                        record[name] = _unflatten(values[offset : offset + size], shape)
+                        offset += size
+                    self._file.write(json.dumps(record).encode() + b"\n")
+                case "binary":
+                    self._file.write(HEADER.pack(soln, wall_time))
+                    self._file.write(values.tobytes())
+
+
+def read_jsonl(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def read_binary(path: str, shapes: dict[str, tuple[int, ...]]):
+    """Loads binary records as a NumPy structured array with one field per registered field"""
+    import numpy as np
+
+    dtype = np.dtype(
+        [("soln", "<i8"), ("wall_time", "<f8")]
+        + [(name, "=i8", shape) for name, shape in shapes.items()]
+    )
+    return np.fromfile(path, dtype=dtype)
+
+
+def _shape(value: Nested) -> tuple[int, ...]:
+    if isinstance(value, (list, tuple)):
+        return (len(value), *(_shape(value[0]) if value else ()))
+    return ()
+
+
+def _size(shape: tuple[int, ...]) -> int:
+    size = 1
+    for n in shape:
+        size *= n
+    return size
+
+
+def _flatten(value: Nested) -> list:
+    if isinstance(value, (list, tuple)):
+        return [var for item in value for var in _flatten(item)]
+    return [value]
+
+
+def _unflatten(values, shape: tuple[int, ...]):
+    if not shape:
+        return values[0]
+    if len(shape) == 1:
+        return list(values)
+    step = _size(shape[1:])
+    return [
+        _unflatten(values[i * step : (i + 1) * step], shape[1:])
+        for i in range(shape[0])
+    ]
+
+
+def test_solution_sink(tmp_path):
+    class FakeCallback:
+        def __init__(self, values: dict[str, int]):
+            self.values = values
+
+        def Value(self, expression: str) -> int:
+            return self.values[expression]
+
+        def WallTime(self) -> float:
+            return 1.5
+
+    fields = {"grid": [["a", "b"], ["c", "d"]], "total": "t"}
+    solutions = [
+        {"a": 1, "b": 2, "c": 3, "d": 4, "t": 10},
+        {"a": 5, "b": 6, "c": 7, "d": 8, "t": 26},
+    ]
+
+    for format in get_args(Format.__value__):
+        path = str(tmp_path / format)
+        with SolutionSink(path, fields, format) as sink:
+            for values in solutions:
+                sink.record(FakeCallback(values))
+
+        if format == "jsonl":
+            records = read_jsonl(path)
+            assert [r["grid"] for r in records] == [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]
+            assert [r["total"] for r in records] == [10, 26]
+        else:
+            records = read_binary(path, sink.shapes)
+            assert records["grid"].tolist() == [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]
+            assert records["total"].tolist() == [10, 26]
+
+        assert [r["soln"] for r in records] == [1, 2]